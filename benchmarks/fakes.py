@@ -0,0 +1,112 @@
+import re
+from typing import Dict, Optional
+
+import pandas as pd
+
+
+class FakeWriter:
+    """Stand-in for ``DataFrame.write`` that records the saved table"""
+
+    def __init__(self, session: "FakeSession", rows: list):
+        self.session = session
+        self.rows = rows
+        self._mode = "append"
+
+    def mode(self, mode: str) -> "FakeWriter":
+        self._mode = mode
+        return self
+
+    def save_as_table(self, table_name: str):
+        if self._mode == "overwrite" or table_name not in self.session.saved:
+            self.session.saved[table_name] = []
+        self.session.saved[table_name].extend(self.rows)
+
+
+class FakeSnowparkDataFrame:
+    """Stand-in for a Snowpark DataFrame returned by ``create_dataframe``"""
+
+    def __init__(self, session: "FakeSession", rows: list):
+        self.write = FakeWriter(session, rows)
+
+
+class FakeAsyncJob:
+    """Stand-in for the ``AsyncJob`` returned by ``to_pandas(block=False)``"""
+
+    def __init__(self, df: pd.DataFrame, query_id: str):
+        self._df = df
+        self.query_id = query_id
+
+    def result(self) -> pd.DataFrame:
+        return self._df
+
+
+class FakeQueryResult:
+    """Stand-in for ``session.sql(...)``"""
+
+    def __init__(self, df: pd.DataFrame, query_id: str = "00000000-0000-0000-0000-000000000000"):
+        self._df = df
+        self._query_id = query_id
+
+    def to_pandas(self, block: bool = True):
+        if not block:
+            return FakeAsyncJob(self._df, self._query_id)
+        return self._df
+
+    def collect(self) -> list:
+        return self._df.to_dict("records")
+
+
+class FakeSession:
+    """In-process Snowpark session double used by the benchmark suite.
+
+    Queries are answered from in-memory DataFrames keyed by table name: the
+    first ``FROM <table>`` in the SQL picks the frame and ``LIMIT n`` truncates
+    it. No SQL is evaluated, so benchmarks measure the client-side cost only
+    (query building, result conversion and serialization), never warehouse time.
+    """
+
+    _from_pattern = re.compile(r"\bFROM\s+([A-Za-z_][\w.]*)", re.IGNORECASE)
+    _limit_pattern = re.compile(r"\bLIMIT\s+(\d+)", re.IGNORECASE)
+
+    def __init__(self, tables: Optional[Dict[str, pd.DataFrame]] = None):
+        self.tables = {name.lower(): df for name, df in (tables or {}).items()}
+        self.saved: Dict[str, list] = {}
+
+    def sql(self, query: str) -> FakeQueryResult:
+        match = self._from_pattern.search(query)
+        df = self.tables.get(match.group(1).lower()) if match else None
+        if df is None:
+            df = pd.DataFrame()
+        limit = self._limit_pattern.search(query)
+        if limit:
+            df = df.head(int(limit.group(1)))
+        return FakeQueryResult(df)
+
+    def create_dataframe(self, df: pd.DataFrame) -> FakeSnowparkDataFrame:
+        # Snowpark serializes the frame before upload; materializing the rows
+        # keeps a comparable per-row cost on the client side.
+        return FakeSnowparkDataFrame(self, df.to_dict("records"))
+
+    def close(self):
+        pass
+
+    def get_current_role(self) -> str:
+        return "BENCH_ROLE"
+
+    def get_current_warehouse(self) -> str:
+        return "BENCH_WAREHOUSE"
+
+    def get_current_database(self) -> str:
+        return "BENCH_DATABASE"
+
+    def get_current_schema(self) -> str:
+        return "BENCH_SCHEMA"
+
+
+def make_fake_helper(tables: Optional[Dict[str, pd.DataFrame]] = None):
+    """Return a ``SnowflakeHelper`` already bound to a ``FakeSession``"""
+    from src.utils.snowflake_helper import SnowflakeHelper
+
+    helper = SnowflakeHelper({"user": "bench"})
+    helper.session = FakeSession(tables)
+    return helper
@@ -0,0 +1,174 @@
+"""Benchmark runner.
+
+Usage (from the repository root)::
+
+    python -m benchmarks --output bench_results.json
+    python -m benchmarks --baseline bench_baseline.json --threshold 0.10
+    python -m benchmarks --group query_tools --filter search_sop
+
+Results are written as JSON. With ``--baseline`` the median of every scenario
+is compared against the baseline file and the process exits with status 1 when
+any scenario regressed by more than its threshold.
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from benchmarks.scenarios import SCENARIO_GROUPS, Scenario
+
+DEFAULT_THRESHOLD = 0.10
+
+
+def time_scenario(scenario: Scenario, repeat: int = 5, warmup: int = 1) -> Dict:
+    """Run a scenario ``warmup + repeat`` times and summarize the timed runs"""
+    state = scenario.setup()
+    samples = []
+    try:
+        for _ in range(warmup):
+            scenario.run(state)
+        for _ in range(repeat):
+            start = time.perf_counter()
+            scenario.run(state)
+            samples.append(time.perf_counter() - start)
+    finally:
+        scenario.teardown(state)
+
+    samples.sort()
+    median = statistics.median(samples)
+    p95_index = min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))
+    return {
+        "name": scenario.name,
+        "group": scenario.group,
+        "params": scenario.params,
+        "status": "ok",
+        "repeat": repeat,
+        "items": scenario.items,
+        "min_s": samples[0],
+        "median_s": median,
+        "mean_s": statistics.fmean(samples),
+        "p95_s": samples[p95_index],
+        "stdev_s": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "items_per_s": scenario.items / median if median > 0 else None,
+    }
+
+
+def run_suite(groups: Optional[List[str]] = None, name_filter: Optional[str] = None,
+              repeat: int = 5, warmup: int = 1) -> Dict:
+    """Run the selected scenario groups and return the JSON-ready report"""
+    results = []
+    for group, builder in SCENARIO_GROUPS.items():
+        if groups and group not in groups:
+            continue
+        try:
+            scenarios = builder()
+        except Exception as e:
+            results.append({"name": group, "group": group, "status": "error", "error": repr(e)})
+            print(f"✗ {group}: {e!r}", file=sys.stderr)
+            continue
+
+        for scenario in scenarios:
+            if name_filter and name_filter not in scenario.name:
+                continue
+            try:
+                result = time_scenario(scenario, repeat=repeat, warmup=warmup)
+            except Exception as e:
+                result = {"name": scenario.name, "group": group, "status": "error", "error": repr(e)}
+                print(f"✗ {scenario.name}: {e!r}", file=sys.stderr)
+            else:
+                print(f"✓ {scenario.name}: median {result['median_s'] * 1000:.3f} ms", file=sys.stderr)
+            if scenario.threshold is not None:
+                result["threshold"] = scenario.threshold
+            results.append(result)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "repeat": repeat,
+            "warmup": warmup,
+        },
+        "results": results,
+    }
+
+
+def compare_to_baseline(report: Dict, baseline: Dict, threshold: float = DEFAULT_THRESHOLD) -> Dict:
+    """Compare scenario medians with a baseline report.
+
+    A scenario regresses when its median grows by more than its threshold
+    (the scenario's own, else ``threshold``) and improves when it shrinks by
+    more than that threshold.
+    """
+    baseline_by_name = {r["name"]: r for r in baseline.get("results", []) if r.get("status") == "ok"}
+    comparison = {}
+    for result in report["results"]:
+        if result.get("status") != "ok":
+            continue
+        name = result["name"]
+        limit = result.get("threshold", threshold)
+        base = baseline_by_name.get(name)
+        if base is None:
+            comparison[name] = {"status": "new", "current_median_s": result["median_s"]}
+            continue
+
+        change = (result["median_s"] - base["median_s"]) / base["median_s"] if base["median_s"] else 0.0
+        if change > limit:
+            status = "regression"
+        elif change < -limit:
+            status = "improvement"
+        else:
+            status = "ok"
+        comparison[name] = {
+            "status": status,
+            "baseline_median_s": base["median_s"],
+            "current_median_s": result["median_s"],
+            "change_pct": round(change * 100, 2),
+            "threshold_pct": round(limit * 100, 2),
+        }
+    return comparison
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Run the benchmark suite")
+    parser.add_argument("--output", "-o", help="Write the JSON report to this file (default: stdout)")
+    parser.add_argument("--baseline", "-b", help="Baseline JSON report to compare against")
+    parser.add_argument("--threshold", "-t", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed relative slowdown before a regression is flagged (default: 0.10)")
+    parser.add_argument("--group", "-g", action="append", choices=sorted(SCENARIO_GROUPS),
+                        help="Only run this scenario group (repeatable)")
+    parser.add_argument("--filter", "-k", help="Only run scenarios whose name contains this string")
+    parser.add_argument("--repeat", "-r", type=int, default=5, help="Timed runs per scenario")
+    parser.add_argument("--warmup", "-w", type=int, default=1, help="Untimed warm-up runs per scenario")
+    parser.add_argument("--no-fail", action="store_true", help="Exit with status 0 even on regressions")
+    args = parser.parse_args(argv)
+
+    report = run_suite(groups=args.group, name_filter=args.filter, repeat=args.repeat, warmup=args.warmup)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        report["comparison"] = compare_to_baseline(report, baseline, threshold=args.threshold)
+        regressions = [name for name, c in report["comparison"].items() if c["status"] == "regression"]
+        for name in regressions:
+            c = report["comparison"][name]
+            print(f"✗ regression: {name} {c['change_pct']:+.1f}% (threshold {c['threshold_pct']}%)",
+                  file=sys.stderr)
+
+    text = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+        print(f"✓ Wrote {len(report['results'])} results to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+    if regressions and not args.no_fail:
+        return 1
+    return 0
@@ -0,0 +1,499 @@
+import contextlib
+import io
+import json
+import time
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+from benchmarks.fakes import make_fake_helper
+
+
+class Scenario:
+    """A reproducible benchmark case.
+
+    ``setup`` builds the inputs once (not timed) and returns a state object;
+    ``run`` is the timed body and receives that state; ``teardown`` (not
+    timed) receives it after the last run. ``items`` is the number of logical
+    units processed per run, used to report throughput. ``threshold``
+    overrides the runner's regression threshold for noisy scenarios.
+    """
+
+    def __init__(self, name: str, group: str, run: Callable, setup: Optional[Callable] = None,
+                 items: int = 1, threshold: Optional[float] = None, params: Optional[Dict] = None,
+                 teardown: Optional[Callable] = None):
+        self.name = name
+        self.group = group
+        self.run = run
+        self.setup = setup or (lambda: None)
+        self.teardown = teardown or (lambda state: None)
+        self.items = items
+        self.threshold = threshold
+        self.params = params or {}
+
+
+SCALE_FACTORS = [1, 4, 16]
+SEED = 42
+
+# Regression thresholds for scenarios dominated by time.sleep round trips and
+# thread scheduling, or by starting a Python subprocess
+SLEEP_THRESHOLD = 0.25
+SUBPROCESS_THRESHOLD = 0.50
+
+
+def _quiet(func: Callable, *args, **kwargs):
+    """Call ``func`` with stdout suppressed (the helpers print progress)"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+def _generate(scale: int) -> Dict:
+    from src.data.enhanced_dummy_data_generator import EnhancedHospitalDataGenerator
+
+    return _quiet(EnhancedHospitalDataGenerator(seed=SEED).generate_all_data, scale=scale)
+
+
+def _generation_scenarios() -> List[Scenario]:
+    scenarios = []
+    for scale in SCALE_FACTORS:
+        scenarios.append(Scenario(
+            name=f"generate_all_data[scale={scale}]",
+            group="data_generation",
+            run=lambda _state, scale=scale: _generate(scale),
+            params={"scale": scale},
+        ))
+    return scenarios
+
+
+def _loading_scenarios() -> List[Scenario]:
+    scenarios = []
+    data = _generate(4)
+    for table_name, df in data.items():
+        def setup(df=df):
+            return make_fake_helper(), df
+
+        def run(state, table_name=table_name):
+            helper, frame = state
+            _quiet(helper.load_data_to_table, frame, table_name, overwrite=True)
+
+        scenarios.append(Scenario(
+            name=f"load_data_to_table[{table_name}]",
+            group="loading",
+            run=run,
+            setup=setup,
+            items=len(df),
+            params={"scale": 4, "rows": len(df)},
+        ))
+    return scenarios
+
+
+def _typed_schema_scenarios() -> List[Scenario]:
+    import pickle
+
+    from src.data.typed_schema import frame_memory, to_load_frame, to_typed
+
+    scale = 16
+    data = _generate(scale)
+    typed = {table: to_typed(df, table) for table, df in data.items()}
+    rows = sum(len(df) for df in data.values())
+    memory = {"object": sum(frame_memory(df) for df in data.values()),
+              "typed": sum(frame_memory(df) for df in typed.values())}
+
+    def serialize(frames):
+        return lambda _state: [pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL) for df in frames.values()]
+
+    return [
+        Scenario(name=f"serialize[{layout},scale={scale}]", group="typed_schema", run=serialize(frames),
+                 items=rows, params={"scale": scale, "memory_bytes": memory[layout]})
+        for layout, frames in (("object", data), ("typed", typed))
+    ] + [
+        Scenario(name=f"to_typed[scale={scale}]", group="typed_schema",
+                 run=lambda _state: [to_typed(df, table) for table, df in data.items()],
+                 items=rows, params={"scale": scale}),
+        Scenario(name=f"to_load_frame[scale={scale}]", group="typed_schema",
+                 run=lambda _state: [to_load_frame(df) for df in typed.values()],
+                 items=rows, params={"scale": scale}),
+    ]
+
+
+def _tools_state():
+    from src.agents.staff_admin import StaffAdminTools
+
+    return StaffAdminTools(make_fake_helper(_generate(16)))
+
+
+def _tool_scenarios() -> List[Scenario]:
+    calls = {
+        "search_sop[category]": lambda t: t.search_sop(category="Patient Care"),
+        "search_sop[keyword]": lambda t: t.search_sop(keyword="admission"),
+        "get_doctor_schedule": lambda t: t.get_doctor_schedule(day="Monday", specialization="Cardiologist"),
+        "check_facility_availability": lambda t: t.check_facility_availability(facility_type="Operating Room"),
+        "get_department_summary": lambda t: t.get_department_summary(),
+    }
+    return [
+        Scenario(name=f"tools.{name}", group="query_tools", run=call, setup=_tools_state, params={"scale": 16})
+        for name, call in calls.items()
+    ]
+
+
+class _SlowTools:
+    """StaffAdminTools wrapper that adds a fixed warehouse round-trip delay per call"""
+
+    def __init__(self, tools, delay_s: float):
+        self._tools = tools
+        self._delay_s = delay_s
+
+    def __getattr__(self, name):
+        func = getattr(self._tools, name)
+
+        def call(**kwargs):
+            time.sleep(self._delay_s)
+            return func(**kwargs)
+        return call
+
+
+def _fanout_scenarios() -> List[Scenario]:
+    from src.agents.staff_admin import StaffAdminAgent
+    from src.agents.tool_executor import ToolExecutor
+
+    delay_s = 0.05
+    query = "Show the emergency SOP, Monday cardiologist schedule and operating room availability"
+
+    def setup(workers: int):
+        tools = _SlowTools(_tools_state(), delay_s)
+        agent = StaffAdminAgent(None, tools, executor=ToolExecutor(tools, max_workers=workers))
+        return agent, agent.route(query)
+
+    return [
+        Scenario(name=f"run_tools[workers={workers},round_trip_ms={int(delay_s * 1000)}]", group="tool_fanout",
+                 run=lambda state: state[0].run_tools(state[1]), setup=lambda workers=workers: setup(workers),
+                 threshold=SLEEP_THRESHOLD, params={"workers": workers, "round_trip_s": delay_s})
+        for workers in (1, 4)
+    ]
+
+
+def _large_tool_results(rows: int) -> Dict:
+    data = _generate(16)
+    schedules = data["doctor_schedule"]
+    repeats = -(-rows // len(schedules))
+    schedules = pd.concat([schedules] * repeats, ignore_index=True)
+    return {
+        "sop_search": {"success": True, "count": len(data["hospital_sop"]),
+                       "sops": data["hospital_sop"].to_dict("records")},
+        "doctor_schedule": {"success": True, "count": rows,
+                            "schedules": schedules.head(rows).to_dict("records")},
+        "facility_availability": {"success": True, "count": len(data["hospital_facilities"]),
+                                  "facilities": data["hospital_facilities"].to_dict("records")},
+    }
+
+
+def _prompt_scenarios() -> List[Scenario]:
+    from src.agents.staff_admin import build_agent_prompt
+
+    scenarios = []
+    for rows in [10, 100, 1000]:
+        scenarios.append(Scenario(
+            name=f"build_agent_prompt[schedule_rows={rows}]",
+            group="prompt_building",
+            run=lambda state: build_agent_prompt("Which cardiologists are available on Monday?", state),
+            setup=lambda rows=rows: _large_tool_results(rows),
+            params={"schedule_rows": rows},
+        ))
+    return scenarios
+
+
+def _availability_scenarios() -> List[Scenario]:
+    from src.agents.availability_index import DoctorAvailabilityIndex
+
+    def build(data):
+        return DoctorAvailabilityIndex.from_frames(data["doctor_schedule"], data["appointments"])
+
+    def setup():
+        return build(_generate(16))
+
+    queries = {
+        "cardio_tuesday_after_14": lambda index: index.find("Cardio", "Tuesday", start="14:00"),
+        "monday_all": lambda index: index.find(day="Monday", limit=10),
+        "doctors_by_specialization": lambda index: index.doctors_by_specialization("Pediatric"),
+        "book_and_cancel": lambda index: (index.book("SCH-0001"), index.cancel("SCH-0001")),
+    }
+    scenarios = [
+        Scenario(name=f"availability.{name}", group="availability", run=query, setup=setup,
+                 params={"scale": 16})
+        for name, query in queries.items()
+    ]
+    scenarios.append(Scenario(
+        name="availability.build[scale=16]", group="availability",
+        run=build, setup=lambda: _generate(16), params={"scale": 16},
+    ))
+    return scenarios
+
+
+def _summarization_scenarios() -> List[Scenario]:
+    from src.agents.summarization import MapReduceSummarizer, SummaryCache
+
+    latency_s = 0.002
+    num_docs = 500
+
+    def fake_summarize(text: str) -> str:
+        # Simulated Cortex round trip; the output is ~1/4 of the input
+        time.sleep(latency_s)
+        return text[: max(200, len(text) // 4)]
+
+    def docs():
+        base = _generate(1)["hospital_sop"].to_dict("records")
+        return [dict(base[i % len(base)], SOP_ID=f"SOP-{i:05d}") for i in range(num_docs)]
+
+    def cold(max_workers):
+        def run(state):
+            MapReduceSummarizer(summarize_fn=fake_summarize, cache=SummaryCache(), max_workers=max_workers,
+                                min_tokens_to_summarize=0).summarize_documents(state)
+        return run
+
+    def setup_warm():
+        summarizer = MapReduceSummarizer(summarize_fn=fake_summarize, cache=SummaryCache(), max_workers=8,
+                                         min_tokens_to_summarize=0)
+        documents = docs()
+        summarizer.summarize_documents(documents)
+        return summarizer, documents
+
+    params = {"documents": num_docs, "latency_ms": latency_s * 1000}
+    return [
+        Scenario(name="summarize[cold,workers=1]", group="summarization", run=cold(1), setup=docs,
+                 items=num_docs, threshold=SLEEP_THRESHOLD, params=params),
+        Scenario(name="summarize[cold,workers=8]", group="summarization", run=cold(8), setup=docs,
+                 items=num_docs, threshold=SLEEP_THRESHOLD, params=params),
+        Scenario(name="summarize[warm_cache]", group="summarization",
+                 run=lambda state: state[0].summarize_documents(state[1]), setup=setup_warm,
+                 items=num_docs, params=params),
+    ]
+
+
+def _sse_lines(num_events: int) -> List[str]:
+    lines = []
+    for i in range(num_events):
+        payload = json.dumps({"content_index": i % 4, "text": f"token {i} "})
+        lines.extend(["event: response.text.delta", f"data: {payload}", ""])
+    lines.extend(["event: response", 'data: {"role": "assistant", "content": []}', ""])
+    return lines
+
+
+def _sse_scenarios() -> List[Scenario]:
+    from src.utils.sse import iter_sse
+
+    def run(lines):
+        for _ in iter_sse(lines):
+            pass
+
+    num_events = 20000
+    return [Scenario(
+        name=f"iter_sse[events={num_events}]",
+        group="sse_parsing",
+        run=run,
+        setup=lambda: _sse_lines(num_events),
+        items=num_events + 1,
+        params={"events": num_events},
+    )]
+
+
+def _streaming_scenarios() -> List[Scenario]:
+    from src.utils.streaming import CompletionStream
+
+    num_tokens = 20000
+    tokens = [f"token{i} " for i in range(num_tokens)]
+
+    def iterate(tokens):
+        for _ in CompletionStream(tokens):
+            pass
+
+    return [
+        Scenario(name=f"completion_stream[iterate,tokens={num_tokens}]", group="streaming",
+                 run=iterate, setup=lambda: tokens, items=num_tokens, params={"tokens": num_tokens}),
+        Scenario(name=f"completion_stream[collect,tokens={num_tokens}]", group="streaming",
+                 run=lambda tokens: CompletionStream(tokens).collect(), setup=lambda: tokens,
+                 items=num_tokens, params={"tokens": num_tokens}),
+    ]
+
+
+def _cache_warming_scenarios() -> List[Scenario]:
+    from src.agents.cache_warmer import CacheWarmer
+    from src.agents.staff_admin import StaffAdminAgent, StaffAdminTools
+    from src.agents.tool_executor import ToolExecutor
+    from src.utils.query_cache import QueryCache
+    from src.utils.streaming import CompletionStream
+
+    round_trip_s, completion_s = 0.05, 0.2
+    questions = [
+        "What is the SOP for patient admission?",
+        "Show me doctor schedules for Monday",
+        "Is there any cardiologist available this week?",
+        "Check the availability of operating rooms",
+    ]
+
+    def slow_stream(prompt, model):
+        def tokens():
+            time.sleep(completion_s)
+            yield from ["Cached ", "answer"]
+        return CompletionStream(tokens(), model=model)
+
+    def setup(warm: bool):
+        helper = make_fake_helper(_generate(1))
+        helper.cortex_complete_stream = slow_stream
+        tools = _SlowTools(StaffAdminTools(helper), round_trip_s)
+        caches = [QueryCache("tool_results"), QueryCache("completions")]
+        agent = StaffAdminAgent(helper, tools, executor=ToolExecutor(tools, cache=caches[0]),
+                                completion_cache=caches[1])
+        warmer = CacheWarmer(agent.respond, questions=questions, caches=caches)
+        if warm:
+            _quiet(warmer.warm, "startup")
+        return agent, warmer
+
+    def run(state):
+        agent, warmer = state
+        if not warmer.runs:
+            warmer.invalidate()
+        for question in questions:
+            agent.respond(question)
+
+    params = {"questions": len(questions), "round_trip_ms": int(round_trip_s * 1000),
+              "completion_ms": int(completion_s * 1000)}
+    return [
+        Scenario(name=f"agent_turns[cold,questions={len(questions)}]", group="cache_warming", run=run,
+                 setup=lambda: setup(False), items=len(questions), threshold=SLEEP_THRESHOLD, params=params),
+        Scenario(name=f"agent_turns[warmed,questions={len(questions)}]", group="cache_warming", run=run,
+                 setup=lambda: setup(True), items=len(questions), threshold=SLEEP_THRESHOLD, params=params),
+    ]
+
+
+def _admission_scenarios() -> List[Scenario]:
+    from src.utils.admission import AdmissionController
+
+    num_calls = 10000
+
+    def run(controller):
+        for _ in range(num_calls):
+            controller.admit(model="mistral-7b", warehouse="COMPUTE_WH", tokens=500)
+
+    def limited():
+        # Limits high enough that no call waits: measures bookkeeping only
+        return AdmissionController(model_limits={"mistral-7b": (1e9, 1e9)},
+                                   warehouse_limits={"COMPUTE_WH": (1e9, 1e9)}, token_budget=10 ** 12)
+
+    return [
+        Scenario(name=f"admit[unlimited,calls={num_calls}]", group="admission", run=run,
+                 setup=AdmissionController, items=num_calls, params={"limits": False}),
+        Scenario(name=f"admit[limited,calls={num_calls}]", group="admission", run=run,
+                 setup=limited, items=num_calls, params={"limits": True}),
+    ]
+
+
+def _agent_history(num_messages: int, rows: int) -> List[dict]:
+    """Assistant messages that each carry a table and a line chart of ``rows`` points"""
+    data = [[f"2025-01-{i % 28 + 1:02d}", str(i), str(i % 97)] for i in range(rows)]
+    row_type = [{"name": "DAY"}, {"name": "ROW_ID"}, {"name": "VISITS"}]
+    values = [{"ROW_ID": i, "VISITS": (i * 7919) % 1000} for i in range(rows)]
+    spec = {"mark": "line", "data": {"values": values},
+            "encoding": {"x": {"field": "ROW_ID", "type": "quantitative"},
+                         "y": {"field": "VISITS", "type": "quantitative"}}}
+    message = {"role": "assistant", "content": [
+        {"type": "text", "text": "Here are the visits."},
+        {"type": "table", "table": {"result_set": {"data": data, "result_set_meta_data": {"row_type": row_type}}}},
+        {"type": "chart", "chart": {"chart_spec": json.dumps(spec)}},
+    ]}
+    return [message] * num_messages
+
+
+def _render_scenarios() -> List[Scenario]:
+    from src.utils.result_render import (
+        RenderCache, page_bounds, parse_chart, result_set_frame, DEFAULT_PAGE_SIZE, DEFAULT_POINT_BUDGET
+    )
+
+    num_messages, rows = 20, 20000
+
+    def prepare(history, cache=None):
+        """What one Streamlit rerun computes before handing data to the browser"""
+        for m, msg in enumerate(history):
+            for i, item in enumerate(msg["content"]):
+                if item["type"] == "table":
+                    build = lambda: result_set_frame(item["table"]["result_set"])
+                    frame = cache.get_or_build((m, i), build) if cache is not None else build()
+                    start, end = page_bounds(1, len(frame), DEFAULT_PAGE_SIZE)
+                    frame.iloc[start:end]
+                elif item["type"] == "chart":
+                    build = lambda: parse_chart(item["chart"], DEFAULT_POINT_BUDGET)
+                    cache.get_or_build((m, i), build) if cache is not None else build()
+
+    def setup_cached():
+        history = _agent_history(num_messages, rows)
+        cache = RenderCache()
+        prepare(history, cache)
+        return history, cache
+
+    params = {"messages": num_messages, "rows": rows}
+    return [
+        Scenario(name=f"render_prepare[uncached,messages={num_messages},rows={rows}]", group="rendering",
+                 run=prepare, setup=lambda: _agent_history(num_messages, rows), params=params),
+        Scenario(name=f"render_prepare[cached,messages={num_messages},rows={rows}]", group="rendering",
+                 run=lambda state: prepare(*state), setup=setup_cached, params=params),
+    ]
+
+
+def _instrumentation_scenarios() -> List[Scenario]:
+    from src.utils import instrumentation
+
+    num_spans = 10000
+
+    def run(_state):
+        for _ in range(num_spans):
+            with instrumentation.span("bench.span", rows=1) as s:
+                s.set(bytes=1)
+
+    def setup_disabled():
+        instrumentation.configure([])
+
+    def setup_histogram():
+        instrumentation.configure([instrumentation.HistogramExporter()])
+
+    return [
+        Scenario(name=f"span[disabled,spans={num_spans}]", group="instrumentation", run=run,
+                 setup=setup_disabled, items=num_spans, params={"exporters": []}),
+        Scenario(name=f"span[histogram,spans={num_spans}]", group="instrumentation", run=run,
+                 setup=setup_histogram, teardown=lambda _state: instrumentation.configure([]),
+                 items=num_spans, params={"exporters": ["histogram"]}),
+    ]
+
+
+def _startup_scenarios() -> List[Scenario]:
+    import subprocess
+    import sys
+
+    def cold_import(module: str):
+        subprocess.run([sys.executable, "-c", f"import {module}"], check=True)
+
+    return [
+        Scenario(name=f"cold_import[{module}]", group="startup",
+                 run=lambda _state, module=module: cold_import(module), threshold=SUBPROCESS_THRESHOLD,
+                 params={"module": module})
+        for module in ["src.config", "src.utils.snowflake_helper", "src.agents.staff_admin"]
+    ]
+
+
+# Group name -> builder. Builders are called lazily by the runner so that a
+# group whose imports fail is reported without aborting the whole suite.
+SCENARIO_GROUPS: Dict[str, Callable[[], List[Scenario]]] = {
+    "data_generation": _generation_scenarios,
+    "loading": _loading_scenarios,
+    "typed_schema": _typed_schema_scenarios,
+    "query_tools": _tool_scenarios,
+    "tool_fanout": _fanout_scenarios,
+    "availability": _availability_scenarios,
+    "prompt_building": _prompt_scenarios,
+    "summarization": _summarization_scenarios,
+    "sse_parsing": _sse_scenarios,
+    "rendering": _render_scenarios,
+    "streaming": _streaming_scenarios,
+    "instrumentation": _instrumentation_scenarios,
+    "admission": _admission_scenarios,
+    "cache_warming": _cache_warming_scenarios,
+    "startup": _startup_scenarios,
+}
@@ -1,19 +1,38 @@
+import copy
 import json
 import os
+import sys
+from typing import TYPE_CHECKING
 
-import numpy as np
-import pandas as pd
-import requests
 import streamlit as st
-from dotenv import load_dotenv
 
-load_dotenv()
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from src.agents.cache_warmer import CacheWarmer, normalize_question
+from src.config import load_env
+from src.utils.admission import INTERACTIVE, AdmissionController, AdmissionRejected
+from src.utils.instrumentation import configure_from_env, span
+from src.utils.query_cache import QueryCache
+from src.utils.result_render import RenderCache, page_bounds, page_count, parse_chart, result_set_frame
+from src.utils.sse import collect_agent_message, iter_sse
+
+if TYPE_CHECKING:
+    # numpy/pandas/requests are imported on first use; most reruns never need them
+    import requests
+
+load_env()
+configure_from_env()
 
 HOST = os.getenv("CORTEX_AGENT_HOST")
 DATABASE = os.getenv("CORTEX_AGENT_DATABASE", "SNOWFLAKE_INTELLIGENCE")
 SCHEMA = os.getenv("CORTEX_AGENT_SCHEMA", "AGENTS")
 AGENT = os.getenv("CORTEX_AGENT_NAME", "STAFFADMINTESTAGENT")
 PAT = os.getenv("SNOWFLAKE_PAT")
+# Where the agent's source tables live; their LAST_ALTERED tells the warmer a load happened
+DATA_DATABASE = os.getenv("SNOWFLAKE_DATABASE", "TEST_DATABASE")
+DATA_SCHEMA = os.getenv("SNOWFLAKE_SCHEMA", "TEST_SCHEMA")
+DATA_WAREHOUSE = os.getenv("SNOWFLAKE_WAREHOUSE", "TEST_WAREHOUSE")
+DATA_TABLES = ["HOSPITAL_SOP", "DOCTOR_SCHEDULE", "HOSPITAL_FACILITIES"]
 
 assert HOST and PAT, "CORTEX_AGENT_HOST and SNOWFLAKE_PAT must be set"
 
@@ -35,46 +54,160 @@ if "messages" not in st.session_state:
     st.session_state.messages = []
 
 
-# Render prior messages (very simple)
-def render_message(msg: dict):
+# Rows per table page, chart points sent to the browser, and how many of the
+# latest messages are shown in full (older ones collapse to a preview)
+PAGE_SIZE = 200
+POINT_BUDGET = 2000
+EXPANDED_MESSAGES = 6
+
+# First-turn answers are shared across sessions for this long; the example
+# questions (plus the most asked live ones) are re-answered in the background
+ANSWER_TTL_S = 900
+
+examples = [
+    "What are the operating hours for the emergency room?",
+    "What is the SOP for patient admission?",
+    "What is the current capacity of the ICU?",
+    "Where is the radiology department located?",
+]
+
+
+def render_cache() -> RenderCache:
+    """Parsed frames/specs for this browser session, keyed by (message, content) index"""
+    if "render_cache" not in st.session_state:
+        st.session_state.render_cache = RenderCache()
+    return st.session_state.render_cache
+
+
+def pop_message():
+    st.session_state.messages.pop()
+    render_cache().evict_from(len(st.session_state.messages))
+
+
+def message_preview(msg: dict) -> str:
+    texts = [item.get("text", "") for item in msg.get("content", []) if item.get("type") == "text"]
+    preview = " ".join(" ".join(texts).split())
+    preview = preview[:80] + "…" if len(preview) > 80 else preview
+    extras = [item.get("type") for item in msg.get("content", []) if item.get("type") in ("table", "chart")]
+    if extras:
+        preview += f" [{', '.join(extras)}]"
+    return preview or msg["role"]
+
+
+def render_table(frame, key: str, container=st):
+    total = len(frame)
+    if total <= PAGE_SIZE:
+        container.dataframe(frame)
+        return
+    pages = page_count(total, PAGE_SIZE)
+    page = container.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, key=f"page_{key}")
+    start, end = page_bounds(page, total, PAGE_SIZE)
+    container.dataframe(frame.iloc[start:end])
+    container.caption(f"Rows {start + 1:,}–{end:,} of {total:,}")
+
+
+def render_chart(spec: dict, original_points: int, container=st):
+    container.vega_lite_chart(spec, use_container_width=True)
+    if original_points > POINT_BUDGET:
+        container.caption(f"Chart downsampled to {len(spec['data']['values']):,} of {original_points:,} points")
+
+
+# Render prior messages; cached frames/specs keep each rerun cheap
+def render_message(msg: dict, index: int, expanded: bool = True):
     with st.chat_message(msg["role"]):
-        for item in msg.get("content", []):
+        if not expanded and not st.toggle(message_preview(msg), key=f"expand_{index}"):
+            return
+        cache = render_cache()
+        for i, item in enumerate(msg.get("content", [])):
             t = item.get("type")
             if t == "text":
                 st.markdown(item.get("text", ""))
             elif t == "chart":
-                spec = json.loads(item["chart"]["chart_spec"])
-                st.vega_lite_chart(spec, use_container_width=True)
+                spec, points = cache.get_or_build((index, i), lambda: parse_chart(item["chart"], POINT_BUDGET))
+                render_chart(spec, points)
             elif t == "table":
                 # item["table"]["result_set"]["data"] is 2D array; names in ["row_type"]
-                rs = item["table"]["result_set"]
-                data_array = np.array(rs["data"])
-                columns = [c["name"] for c in rs["result_set_meta_data"]["row_type"]]
-                st.dataframe(pd.DataFrame(data_array, columns=columns))
+                frame = cache.get_or_build((index, i), lambda: result_set_frame(item["table"]["result_set"]))
+                render_table(frame, f"{index}_{i}")
             else:
                 with st.expander(t or "content"):
                     st.json(item)
 
 
-for m in st.session_state.messages:
-    render_message(m)
+history = st.session_state.messages
+for i, m in enumerate(history):
+    render_message(m, i, expanded=i >= len(history) - EXPANDED_MESSAGES)
+
+
+@st.cache_resource
+def get_admission() -> AdmissionController:
+    """One controller shared by every browser session of this app"""
+    return AdmissionController(model_limits={AGENT: (2.0, 5)}, max_queued={INTERACTIVE: 16},
+                               max_wait_s={INTERACTIVE: 15.0})
+
+
+@st.cache_resource
+def get_answer_cache() -> QueryCache:
+    """Assistant messages for single-question conversations, keyed by normalized question"""
+    return QueryCache("agent_answers", max_entries=256, ttl_s=ANSWER_TTL_S)
 
 
 # Make a run request to the Agent
-def agent_run(messages: list) -> requests.Response:
+def agent_run(messages: list, admission: AdmissionController = None) -> "requests.Response":
     # Agent expects {"model": "...", "messages":[...]} — "model" can be omitted; the agent config decides.
     body = {
         "messages": messages,
         "stream": True  # ensure SSE stream for deltas / tables / charts
     }
-    resp = requests.post(RUN_URL, headers=HEADERS, json=body, stream=True)
+    import requests
+
+    # Raises AdmissionRejected when too many users are already waiting
+    (admission or get_admission()).admit(model=AGENT)
+    with span("cortex_agent.run", num_messages=len(messages)) as s:
+        resp = requests.post(RUN_URL, headers=HEADERS, json=body, stream=True)
+        s.set(status_code=resp.status_code, request_id=resp.headers.get("X-Snowflake-Request-Id"))
     if resp.status_code >= 400:
         raise RuntimeError(f"Request failed ({resp.status_code}): {resp.text}")
     return resp
 
 
+def data_version() -> list:
+    """``LAST_ALTERED`` of the agent's source tables via the SQL API; changes after every load"""
+    import requests
+
+    names = ", ".join(f"'{table}'" for table in DATA_TABLES)
+    body = {
+        "statement": f"SELECT TABLE_NAME, LAST_ALTERED FROM {DATA_DATABASE}.INFORMATION_SCHEMA.TABLES "
+                     f"WHERE TABLE_SCHEMA = '{DATA_SCHEMA}' AND TABLE_NAME IN ({names}) ORDER BY TABLE_NAME",
+        "warehouse": DATA_WAREHOUSE,
+        "timeout": 30,
+    }
+    headers = {**HEADERS, "Accept": "application/json"}
+    resp = requests.post(f"https://{HOST}/api/v2/statements", headers=headers, json=body, timeout=30)
+    resp.raise_for_status()
+    return resp.json()["data"]
+
+
+@st.cache_resource
+def get_warmer() -> CacheWarmer:
+    """Answers the frequent questions at startup and keeps them fresh (one per server)"""
+    cache, admission = get_answer_cache(), get_admission()
+
+    def answer(question: str) -> dict:
+        def ask():
+            resp = agent_run([{"role": "user", "content": [{"type": "text", "text": question}]}], admission)
+            return collect_agent_message(iter_sse(resp.iter_lines(decode_unicode=True)))
+        return cache.get_or_compute(normalize_question(question), ask)
+
+    # Cached answers are dropped and re-warmed when a load changes the source tables
+    warmer = CacheWarmer(answer, questions=examples, caches=[cache], max_questions=8,
+                         data_version=data_version, interval_s=ANSWER_TTL_S / 3)
+    warmer.start()
+    return warmer
+
+
 # Stream events and update UI
-def stream_events(response: requests.Response):
+def stream_events(response: "requests.Response"):
     import json
     from collections import defaultdict
 
@@ -82,34 +215,12 @@ def stream_events(response: requests.Response):
     content_map = defaultdict(content.empty)
     buffers = defaultdict(str)
 
-    def iter_sse(resp: requests.Response):
-        """Minimal SSE parser over a requests streaming response."""
-        event, data_lines = None, []
-        for raw in resp.iter_lines(decode_unicode=True):
-            if raw is None:
-                continue
-            line = raw.rstrip("\n")
-            if line == "":
-                if data_lines:
-                    yield (event or "message", "\n".join(data_lines))
-                event, data_lines = None, []
-                continue
-            if line.startswith(":"):
-                continue
-            if line.startswith("event:"):
-                event = line[6:].strip()
-            elif line.startswith("data:"):
-                data_lines.append(line[5:].lstrip())
-
-        if data_lines:
-            yield (event or "message", "\n".join(data_lines))
-
     spinner = st.spinner("Waiting for response...")
     spinner.__enter__()
 
     assistant_msg = {"role": "assistant", "content": []}
 
-    for etype, payload in iter_sse(response):
+    for etype, payload in iter_sse(response.iter_lines(decode_unicode=True)):
         if etype == "response.status":
             spinner.__exit__(None, None, None)
             d = json.loads(payload)
@@ -134,17 +245,14 @@ def stream_events(response: requests.Response):
 
         elif etype == "response.table":
             d = json.loads(payload)
-            rs = d["result_set"]
-            arr = np.array(rs["data"])
-            cols = [c["name"] for c in rs["result_set_meta_data"]["row_type"]]
-            df = pd.DataFrame(arr, columns=cols)
-            content_map[d["content_index"]].dataframe(df)
+            df = result_set_frame(d["result_set"])
+            render_table(df, f"live_{d['content_index']}", content_map[d["content_index"]].container())
             assistant_msg["content"].append({"type": "table", "table": d})
 
         elif etype == "response.chart":
             d = json.loads(payload)
-            spec = json.loads(d["chart_spec"])
-            content_map[d["content_index"]].vega_lite_chart(spec, use_container_width=True)
+            spec, points = parse_chart(d, POINT_BUDGET)
+            render_chart(spec, points, content_map[d["content_index"]].container())
             assistant_msg["content"].append({"type": "chart", "chart": d})
 
         elif etype in ("response.tool_use", "response.tool_result"):
@@ -161,7 +269,7 @@ def stream_events(response: requests.Response):
             except Exception:
                 st.error(f"Agent error: {payload}")
             if st.session_state.messages:
-                st.session_state.messages.pop()
+                pop_message()
             return
 
         elif etype == "response":
@@ -181,17 +289,37 @@ def stream_events(response: requests.Response):
 
 # Send a new user message and start streaming
 def send(prompt: str):
+    # Only a conversation's first question can be answered from the shared cache
+    first_turn = not st.session_state.messages
+    question_key = normalize_question(prompt)
+    get_warmer().record(prompt)
     user_msg = {"role": "user", "content": [{"type": "text", "text": prompt}]}
     st.session_state.messages.append(user_msg)
     with st.chat_message("user"):
         st.markdown(prompt)
 
-    with st.chat_message("assistant"):
+    if first_turn:
+        found, answer = get_answer_cache().lookup(question_key)
+        if found:
+            st.session_state.messages.append(copy.deepcopy(answer))
+            render_message(st.session_state.messages[-1], len(st.session_state.messages) - 1)
+            return
+
+    with st.chat_message("assistant"), span("agent.turn", source="cortex_agent"):
         with st.spinner("Sending request..."):
-            resp = agent_run(st.session_state.messages)
+            try:
+                resp = agent_run(st.session_state.messages)
+            except AdmissionRejected as e:
+                pop_message()
+                st.warning(f"The agent is busy, please try again in a moment ({e.reason}).")
+                return
         # Expose Snowflake Request ID for debugging
         st.markdown(f"```request_id: {resp.headers.get('X-Snowflake-Request-Id')}```")
-        stream_events(resp)
+        with span("cortex_agent.stream", request_id=resp.headers.get("X-Snowflake-Request-Id")):
+            stream_events(resp)
+    messages = st.session_state.messages
+    if first_turn and len(messages) == 2 and messages[-1]["role"] == "assistant":
+        get_answer_cache().put(question_key, copy.deepcopy(messages[-1]))
 
 
 # Input box
@@ -201,13 +329,13 @@ if user_input := st.chat_input("Ask your Snowflake agent…"):
 # Example buttons
 st.markdown("### 💡 Example Questions")
 cols = st.columns(2)
-examples = [
-    "What are the operating hours for the emergency room?",
-    "What is the SOP for patient admission?",
-    "What is the current capacity of the ICU?",
-    "Where is the radiology department located?",
-]
 
 for i, question in enumerate(examples):
     if cols[i % 2].button(question):
         send(question)
+
+with st.sidebar.expander("Answer cache"):
+    ratios = get_warmer().stats()["caches"]["agent_answers"]
+    st.caption(f"{ratios['hit_ratio']:.0%} of first questions answered from cache "
+               f"({ratios['warm_hit_ratio']:.0%} pre-warmed, {ratios['cold_hit_ratio']:.0%} from earlier sessions)")
+    st.json(get_warmer().stats())
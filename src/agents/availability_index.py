@@ -0,0 +1,394 @@
+import bisect
+import threading
+import time as _time
+from datetime import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
+
+from src.utils.admission import background
+from src.utils.instrumentation import span
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DAYS_OF_WEEK = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# Appointment statuses that hold a place in a schedule slot
+BOOKED_STATUSES = ("SCHEDULED",)
+
+AVAILABILITY_TABLE = "doctor_availability"
+
+# Seconds between re-syncs of a Snowflake-backed index; matches the dynamic table's default lag
+DEFAULT_REFRESH_INTERVAL_S = 60.0
+
+# Materialized counterpart of DoctorAvailabilityIndex. A dynamic table with an
+# incremental refresh only reprocesses schedules whose appointments changed.
+CREATE_AVAILABILITY_TABLE_SQL = """
+CREATE OR REPLACE DYNAMIC TABLE {table}
+TARGET_LAG = '{target_lag}'
+WAREHOUSE = {warehouse}
+REFRESH_MODE = INCREMENTAL
+CLUSTER BY (SPECIALIZATION, DAY_OF_WEEK)
+AS
+SELECT
+    d.SCHEDULE_ID,
+    d.DOCTOR_ID,
+    d.DOCTOR_NAME,
+    d.SPECIALIZATION,
+    d.DAY_OF_WEEK,
+    d.START_TIME,
+    d.END_TIME,
+    d.ROOM_NUMBER,
+    d.MAX_PATIENTS,
+    COUNT(a.APPOINTMENT_ID) as BOOKED_APPOINTMENTS,
+    d.MAX_PATIENTS - COUNT(a.APPOINTMENT_ID) as REMAINING_CAPACITY
+FROM doctor_schedule d
+LEFT JOIN appointments a
+    ON a.SCHEDULE_ID = d.SCHEDULE_ID
+    AND a.STATUS IN ({booked_statuses})
+GROUP BY d.SCHEDULE_ID, d.DOCTOR_ID, d.DOCTOR_NAME, d.SPECIALIZATION, d.DAY_OF_WEEK,
+         d.START_TIME, d.END_TIME, d.ROOM_NUMBER, d.MAX_PATIENTS
+"""
+
+TimeLike = Union[time, str, None]
+
+
+def to_minutes(value: TimeLike) -> Optional[int]:
+    """Convert a ``datetime.time`` or ``"HH:MM[:SS]"`` string to minutes since midnight (seconds are dropped)"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        hours, _, rest = value.strip().partition(":")
+        minutes = rest.partition(":")[0]
+        return int(hours) * 60 + int(minutes or 0)
+    return value.hour * 60 + value.minute
+
+
+class ScheduleSlot:
+    """One weekly schedule slot with its remaining patient capacity"""
+
+    __slots__ = ("schedule_id", "doctor_id", "doctor_name", "specialization", "day",
+                 "start", "end", "room_number", "max_patients", "booked")
+
+    def __init__(self, schedule_id: str, doctor_id: str, doctor_name: str, specialization: str,
+                 day: str, start: int, end: int, room_number: str, max_patients: int, booked: int):
+        self.schedule_id = schedule_id
+        self.doctor_id = doctor_id
+        self.doctor_name = doctor_name
+        self.specialization = specialization
+        self.day = day
+        self.start = start
+        self.end = end
+        self.room_number = room_number
+        self.max_patients = max_patients
+        self.booked = booked
+
+    @property
+    def remaining(self) -> int:
+        return self.max_patients - self.booked
+
+    def to_record(self) -> dict:
+        """Return the row shape used by ``StaffAdminTools.get_doctor_schedule``"""
+        return {
+            "SCHEDULE_ID": self.schedule_id,
+            "DOCTOR_ID": self.doctor_id,
+            "DOCTOR_NAME": self.doctor_name,
+            "SPECIALIZATION": self.specialization,
+            "DAY_OF_WEEK": self.day,
+            "START_TIME": time(self.start // 60, self.start % 60),
+            "END_TIME": time(self.end // 60, self.end % 60),
+            "ROOM_NUMBER": self.room_number,
+            "MAX_PATIENTS": self.max_patients,
+            "BOOKED_PATIENTS": self.booked,
+            "AVAILABLE_SLOTS": self.remaining,
+        }
+
+
+class _Bucket:
+    """Slots for one (specialization, day), sorted by start time"""
+
+    __slots__ = ("starts", "slots", "max_duration")
+
+    def __init__(self):
+        self.starts: List[Tuple[int, str]] = []
+        self.slots: List[ScheduleSlot] = []
+        self.max_duration = 0
+
+    def insert(self, slot: ScheduleSlot):
+        key = (slot.start, slot.schedule_id)
+        i = bisect.bisect_left(self.starts, key)
+        self.starts.insert(i, key)
+        self.slots.insert(i, slot)
+        self.max_duration = max(self.max_duration, slot.end - slot.start)
+
+    def remove(self, slot: ScheduleSlot):
+        i = bisect.bisect_left(self.starts, (slot.start, slot.schedule_id))
+        del self.starts[i]
+        del self.slots[i]
+
+    def overlapping(self, start: int, end: int) -> List[ScheduleSlot]:
+        """Slots with ``slot.start < end`` and ``slot.end > start``
+
+        No slot starting before ``start - max_duration`` can reach ``start``, so
+        the scan is bounded by two bisections: O(log n + k).
+        """
+        lo = bisect.bisect_left(self.starts, (start - self.max_duration, ""))
+        hi = bisect.bisect_left(self.starts, (end, ""))
+        return [slot for slot in self.slots[lo:hi] if slot.end > start]
+
+
+class DoctorAvailabilityIndex:
+    """In-process doctor availability keyed by (specialization, day, time interval)
+
+    Remaining capacity is ``MAX_PATIENTS`` minus booked appointments. Bookings
+    and cancellations update a single slot in place; no rescan is needed.
+
+    An index loaded with ``from_snowflake`` re-syncs from the materialized
+    table every ``refresh_interval_s`` in a background thread, touching only
+    slots whose row changed, so ``find`` never waits on the warehouse.
+    """
+
+    def __init__(self):
+        self._buckets: Dict[Tuple[str, str], _Bucket] = {}
+        self._slots: Dict[str, ScheduleSlot] = {}
+        self._specializations: Dict[str, str] = {}
+        self._lock = threading.RLock()
+        # Set by from_snowflake: where refresh reads from and how often
+        self._source: Optional[Tuple[object, str]] = None
+        self.refresh_interval_s: Optional[float] = None
+        self.loaded_at: Optional[float] = None
+        self._stop_refresh = threading.Event()
+        self._refresh_thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    @classmethod
+    def from_frames(cls, schedule_df: "pd.DataFrame",
+                    appointments_df: Optional["pd.DataFrame"] = None) -> "DoctorAvailabilityIndex":
+        """Build the index from ``doctor_schedule`` (and optionally ``appointments``) frames
+
+        Without appointments, the ``BOOKED_APPOINTMENTS`` column of the materialized
+        table (or the schedule's ``BOOKED_PATIENTS``) is used.
+        """
+        booked_counts = None
+        if appointments_df is not None:
+            active = appointments_df[appointments_df["STATUS"].isin(BOOKED_STATUSES)]
+            booked_counts = active.groupby("SCHEDULE_ID").size().to_dict()
+
+        index = cls()
+        for row in schedule_df.to_dict("records"):
+            if booked_counts is not None:
+                booked = booked_counts.get(row["SCHEDULE_ID"], 0)
+            else:
+                booked = row.get("BOOKED_APPOINTMENTS", row.get("BOOKED_PATIENTS", 0))
+            index.add_slot(_slot_from_row(row, booked))
+        return index
+
+    @classmethod
+    def from_snowflake(cls, sf_helper, table: str = AVAILABILITY_TABLE,
+                       refresh_interval_s: Optional[float] = DEFAULT_REFRESH_INTERVAL_S) -> "DoctorAvailabilityIndex":
+        """Load the index from the materialized availability table in one query
+
+        A background thread re-syncs the index from ``table`` every
+        ``refresh_interval_s`` seconds (``None`` disables it; call ``refresh``
+        yourself).
+        """
+        with span("availability.load", table=table) as s:
+            df = sf_helper.execute_query(f"SELECT * FROM {table}")
+            index = cls.from_frames(df)
+            s.set(rows=len(index))
+        index._source = (sf_helper, table)
+        index.refresh_interval_s = refresh_interval_s
+        index.loaded_at = _time.monotonic()
+        index.start_refresh()
+        print(f"✓ Loaded availability index with {len(index)} schedule slots")
+        return index
+
+    def sync_frame(self, df: "pd.DataFrame") -> Dict[str, int]:
+        """Make the index match ``df`` (rows of the availability table), touching only changed slots"""
+        added = updated = 0
+        with self._lock:
+            seen = set()
+            for row in df.to_dict("records"):
+                slot = _slot_from_row(row, row.get("BOOKED_APPOINTMENTS", row.get("BOOKED_PATIENTS", 0)))
+                seen.add(slot.schedule_id)
+                current = self._slots.get(slot.schedule_id)
+                if current is None:
+                    self.add_slot(slot)
+                    added += 1
+                elif (current.specialization, current.day, current.start, current.end) != \
+                        (slot.specialization, slot.day, slot.start, slot.end):
+                    # Moved to another bucket or position
+                    self.add_slot(slot)
+                    updated += 1
+                elif (current.booked, current.max_patients, current.doctor_name, current.room_number) != \
+                        (slot.booked, slot.max_patients, slot.doctor_name, slot.room_number):
+                    current.booked, current.max_patients = slot.booked, slot.max_patients
+                    current.doctor_name, current.room_number = slot.doctor_name, slot.room_number
+                    updated += 1
+            removed = [schedule_id for schedule_id in self._slots if schedule_id not in seen]
+            for schedule_id in removed:
+                self.remove_slot(schedule_id)
+        return {"added": added, "updated": updated, "removed": len(removed)}
+
+    def refresh(self) -> Dict[str, int]:
+        """Re-read the availability table and apply the differences"""
+        if self._source is None:
+            raise ValueError("refresh needs an index loaded with from_snowflake")
+        sf_helper, table = self._source
+        with span("availability.refresh", table=table) as s:
+            counts = self.sync_frame(sf_helper.execute_query(f"SELECT * FROM {table}"))
+            s.set(**counts)
+        self.loaded_at = _time.monotonic()
+        return counts
+
+    def _refresh_loop(self):
+        while not self._stop_refresh.wait(self.refresh_interval_s):
+            try:
+                # Re-syncs queue behind interactive queries when admission control is on
+                with background():
+                    self.refresh()
+            except Exception as e:
+                # Serve the last good data; retry after another interval
+                print(f"Note: availability refresh failed ({e})")
+
+    def start_refresh(self) -> Optional[threading.Thread]:
+        """Re-sync every ``refresh_interval_s`` in a daemon thread until ``stop_refresh``"""
+        if self._source is None or self.refresh_interval_s is None:
+            return None
+        if self._refresh_thread is None or not self._refresh_thread.is_alive():
+            self._stop_refresh.clear()
+            self._refresh_thread = threading.Thread(target=self._refresh_loop, name="aura-availability-refresh",
+                                                    daemon=True)
+            self._refresh_thread.start()
+        return self._refresh_thread
+
+    def stop_refresh(self):
+        self._stop_refresh.set()
+
+    def add_slot(self, slot: ScheduleSlot):
+        """Add or replace a schedule slot"""
+        with self._lock:
+            if slot.schedule_id in self._slots:
+                self.remove_slot(slot.schedule_id)
+            key = (slot.specialization.lower(), slot.day.lower())
+            self._buckets.setdefault(key, _Bucket()).insert(slot)
+            self._slots[slot.schedule_id] = slot
+            self._specializations[slot.specialization.lower()] = slot.specialization
+
+    def remove_slot(self, schedule_id: str):
+        with self._lock:
+            slot = self._slots.pop(schedule_id)
+            self._buckets[(slot.specialization.lower(), slot.day.lower())].remove(slot)
+
+    def book(self, schedule_id: str, count: int = 1):
+        """Record ``count`` new bookings against a slot"""
+        with self._lock:
+            self._slots[schedule_id].booked += count
+
+    def cancel(self, schedule_id: str, count: int = 1):
+        """Release ``count`` bookings from a slot"""
+        with self._lock:
+            slot = self._slots[schedule_id]
+            slot.booked = max(0, slot.booked - count)
+
+    def apply_appointment_change(self, schedule_id: str, old_status: Optional[str], new_status: Optional[str]):
+        """Update capacity for an appointment insert (old None), delete (new None) or status change"""
+        was_booked = old_status in BOOKED_STATUSES
+        is_booked = new_status in BOOKED_STATUSES
+        if is_booked and not was_booked:
+            self.book(schedule_id)
+        elif was_booked and not is_booked:
+            self.cancel(schedule_id)
+
+    def _matching_keys(self, specialization: Optional[str], day: Optional[str]) -> List[Tuple[str, str]]:
+        specs = list(self._specializations)
+        if specialization:
+            needle = specialization.lower()
+            specs = [spec for spec in specs if needle in spec]
+        days = [day.lower()] if day else [d.lower() for d in DAYS_OF_WEEK]
+        return [(spec, d) for spec in specs for d in days if (spec, d) in self._buckets]
+
+    def find(self, specialization: Optional[str] = None, day: Optional[str] = None,
+             start: TimeLike = None, end: TimeLike = None, doctor_name: Optional[str] = None,
+             min_remaining: Optional[int] = 1, limit: Optional[int] = None) -> List[ScheduleSlot]:
+        """Find slots overlapping ``[start, end)`` with at least ``min_remaining`` places
+
+        Pass ``min_remaining=None`` to include full slots.
+
+        ``specialization`` and ``doctor_name`` match case-insensitive substrings
+        (like the ILIKE filters they replace). Results are ordered by weekday,
+        then start time.
+
+        Example: free cardiologists Tuesday after 14:00 ->
+        ``find("cardio", "Tuesday", start="14:00")``
+        """
+        start_min = to_minutes(start) if start is not None else 0
+        end_min = to_minutes(end) if end is not None else 24 * 60
+        name_needle = doctor_name.lower() if doctor_name else None
+
+        with self._lock:
+            found = []
+            for key in self._matching_keys(specialization, day):
+                for slot in self._buckets[key].overlapping(start_min, end_min):
+                    if min_remaining is not None and slot.remaining < min_remaining:
+                        continue
+                    if name_needle and name_needle not in slot.doctor_name.lower():
+                        continue
+                    found.append(slot)
+
+        found.sort(key=lambda s: (DAYS_OF_WEEK.index(s.day), s.start, s.doctor_name))
+        return found[:limit] if limit else found
+
+    def doctors_by_specialization(self, specialization: str) -> List[dict]:
+        """Doctors with available slots, their days and slot counts (per doctor)"""
+        doctors: Dict[str, dict] = {}
+        for slot in self.find(specialization=specialization):
+            doctor = doctors.setdefault(slot.doctor_id or slot.doctor_name, {
+                "DOCTOR_ID": slot.doctor_id,
+                "DOCTOR_NAME": slot.doctor_name,
+                "SPECIALIZATION": slot.specialization,
+                "days": [],
+                "TOTAL_SLOTS": 0,
+            })
+            if slot.day not in doctor["days"]:
+                doctor["days"].append(slot.day)
+            doctor["TOTAL_SLOTS"] += 1
+
+        result = []
+        for doctor in sorted(doctors.values(), key=lambda d: d["DOCTOR_NAME"]):
+            days = doctor.pop("days")
+            doctor["AVAILABLE_DAYS"] = ", ".join(days)
+            result.append(doctor)
+        return result
+
+    def remaining_capacity(self, specialization: Optional[str] = None, day: Optional[str] = None,
+                           start: TimeLike = None, end: TimeLike = None) -> int:
+        """Total places left across matching slots"""
+        return sum(slot.remaining for slot in self.find(specialization, day, start, end))
+
+
+def _slot_from_row(row: dict, booked) -> ScheduleSlot:
+    return ScheduleSlot(
+        schedule_id=row["SCHEDULE_ID"],
+        doctor_id=row.get("DOCTOR_ID"),
+        doctor_name=row["DOCTOR_NAME"],
+        specialization=row["SPECIALIZATION"],
+        day=row["DAY_OF_WEEK"],
+        start=to_minutes(row["START_TIME"]),
+        end=to_minutes(row["END_TIME"]),
+        room_number=row["ROOM_NUMBER"],
+        max_patients=int(row["MAX_PATIENTS"]),
+        booked=int(booked),
+    )
+
+
+def create_availability_table(sf_helper, warehouse: str, target_lag: str = "1 minute",
+                              table: str = AVAILABILITY_TABLE):
+    """Create (or replace) the materialized ``doctor_availability`` dynamic table"""
+    booked_statuses = ", ".join(f"'{status}'" for status in BOOKED_STATUSES)
+    sql = CREATE_AVAILABILITY_TABLE_SQL.format(
+        table=table, target_lag=target_lag, warehouse=warehouse, booked_statuses=booked_statuses
+    )
+    sf_helper.execute_query(sql)
+    print(f"✓ Created dynamic table {table} (TARGET_LAG = '{target_lag}')")
@@ -0,0 +1,200 @@
+"""Pre-answer the questions staff ask most so repeats come from the caches.
+
+Usage::
+
+    from src.agents.cache_warmer import CacheWarmer, table_versions
+
+    warmer = CacheWarmer(
+        agent.respond,                              # fills the tool/completion caches
+        questions=test_queries,                     # seed set until live traffic takes over
+        caches=[tool_cache, completion_cache],
+        data_version=lambda: table_versions(sf_helper, ["hospital_sop", "doctor_schedule"]),
+    )
+    warmer.start()                                  # warm now, then after every data load
+    ...
+    warmer.record(user_query)                       # count live questions
+
+Replays run at background admission priority, so they never queue ahead of
+interactive questions.
+"""
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from src.utils.admission import background
+from src.utils.concurrency import map_concurrently
+from src.utils.instrumentation import span
+from src.utils.query_cache import QueryCache, warming
+
+
+def normalize_question(question: str) -> str:
+    """Case-, whitespace- and trailing-punctuation-insensitive form used as the question key"""
+    return re.sub(r"\s+", " ", question.lower()).strip(" ?!.")
+
+
+class QuestionFrequency:
+    """Exponentially decayed counts of live questions
+
+    A question asked ``half_life_s`` ago weighs half as much as one asked
+    now, so the warm set follows what staff are currently asking.
+    """
+
+    def __init__(self, half_life_s: float = 24 * 3600.0, max_tracked: int = 1000):
+        self.half_life_s = half_life_s
+        self.max_tracked = max_tracked
+        # normalized -> [score, updated_at, latest phrasing]
+        self._scores: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def _decayed(self, entry: list, now: float) -> float:
+        return entry[0] * 0.5 ** ((now - entry[1]) / self.half_life_s)
+
+    def record(self, question: str):
+        key = normalize_question(question)
+        if not key:
+            return
+        now = time.monotonic()
+        with self._lock:
+            entry = self._scores.get(key)
+            score = self._decayed(entry, now) if entry else 0.0
+            self._scores[key] = [score + 1.0, now, question]
+            if len(self._scores) > self.max_tracked:
+                coldest = min(self._scores, key=lambda k: self._decayed(self._scores[k], now))
+                del self._scores[coldest]
+
+    def top(self, n: int) -> List[str]:
+        """The ``n`` most frequent questions, most frequent first"""
+        now = time.monotonic()
+        with self._lock:
+            ranked = sorted(self._scores.values(), key=lambda e: self._decayed(e, now), reverse=True)
+        return [entry[2] for entry in ranked[:n]]
+
+
+def table_versions(sf_helper, tables: Iterable[str]) -> tuple:
+    """``LAST_ALTERED`` of ``tables`` in the current schema; changes after every load"""
+    names = ", ".join(f"'{table.upper()}'" for table in tables)
+    df = sf_helper.execute_query(f"""
+    SELECT TABLE_NAME, LAST_ALTERED
+    FROM INFORMATION_SCHEMA.TABLES
+    WHERE TABLE_SCHEMA = CURRENT_SCHEMA() AND TABLE_NAME IN ({names})
+    ORDER BY TABLE_NAME
+    """)
+    return tuple(map(tuple, df.itertuples(index=False)))
+
+
+class CacheWarmer:
+    """Replay frequent questions through ``answer`` to fill the caches behind it
+
+    The warm set is the most frequent live questions (see ``record``),
+    topped up from the seed ``questions``, up to ``max_questions``. ``answer``
+    is the normal answering path (e.g. ``agent.respond``); every cache it
+    reads while warming marks its new entries as warm.
+
+    ``start`` warms once in a background thread, then every ``interval_s``
+    checks ``data_version``: when it changes (a data load) the ``caches``
+    are cleared and re-warmed; otherwise the warm set is replayed so
+    entries close to their TTL are refreshed.
+    """
+
+    def __init__(self, answer: Callable[[str], Any], questions: Iterable[str] = (),
+                 caches: Iterable[QueryCache] = (), frequency: Optional[QuestionFrequency] = None,
+                 max_questions: int = 20, max_workers: int = 2,
+                 data_version: Optional[Callable[[], Any]] = None, interval_s: float = 300.0):
+        self.answer = answer
+        self.questions = list(questions)
+        self.caches = list(caches)
+        self.frequency = frequency or QuestionFrequency()
+        self.max_questions = max_questions
+        self.max_workers = max_workers
+        self.data_version = data_version
+        self.interval_s = interval_s
+        self.runs: List[Dict] = []
+        self._version = None
+        self._warmed = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def record(self, question: str):
+        """Count a live question towards the warm set"""
+        self.frequency.record(question)
+
+    def warm_set(self) -> List[str]:
+        selected, seen = [], set()
+        for question in self.frequency.top(self.max_questions) + self.questions:
+            key = normalize_question(question)
+            if key and key not in seen:
+                seen.add(key)
+                selected.append(question)
+        return selected[:self.max_questions]
+
+    def warm(self, reason: str = "manual") -> Dict:
+        """Replay the warm set now (blocking); returns a summary of the run"""
+        questions = self.warm_set()
+        start = time.perf_counter()
+        with span("cache_warmer.warm", reason=reason, questions=len(questions)) as s, background(), warming():
+            results = map_concurrently(self.answer, questions, self.max_workers)
+            errors = {q: f"{type(r).__name__}: {r}" for q, r in zip(questions, results) if isinstance(r, Exception)}
+            s.set(errors=len(errors))
+        run = {"reason": reason, "questions": len(questions), "errors": errors,
+               "seconds": round(time.perf_counter() - start, 3), "finished_at": time.time()}
+        self.runs = (self.runs + [run])[-20:]
+        self._warmed.set()
+        print(f"✓ Warmed {len(questions) - len(errors)}/{len(questions)} questions ({reason}) "
+              f"in {run['seconds']:.1f}s")
+        return run
+
+    def invalidate(self):
+        for cache in self.caches:
+            cache.clear()
+
+    def on_data_load(self) -> Dict:
+        """Drop cached answers built on the old data and warm again"""
+        self.invalidate()
+        return self.warm("data_load")
+
+    def _check_version(self) -> bool:
+        """True when ``data_version`` changed since the last check"""
+        if self.data_version is None:
+            return False
+        try:
+            with background():
+                version = self.data_version()
+        except Exception as e:
+            print(f"Note: data version check failed ({e})")
+            return False
+        changed = self._version is not None and version != self._version
+        self._version = version
+        return changed
+
+    def _loop(self):
+        self._check_version()
+        self.warm("startup")
+        while not self._stop.wait(self.interval_s):
+            if self._check_version():
+                self.on_data_load()
+            else:
+                self.warm("refresh")
+
+    def start(self) -> threading.Thread:
+        """Warm in a daemon thread now and keep warm until ``stop``"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="aura-cache-warmer", daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the first warm-up finished; False on timeout"""
+        return self._warmed.wait(timeout)
+
+    def stats(self) -> Dict:
+        """Warm set size, recent runs and warm/cold hit ratios per cache"""
+        return {
+            "warm_set": len(self.warm_set()),
+            "last_run": self.runs[-1] if self.runs else None,
+            "caches": {cache.name: cache.hit_ratios() for cache in self.caches},
+        }
@@ -0,0 +1,184 @@
+from typing import Dict, List, Optional
+
+from src.utils.instrumentation import span
+from src.utils.sql import sql_literal
+
+
+class SearchDocumentSpec:
+    """How one source table becomes Cortex Search documents
+
+    ``document`` lists the parts of ``SEARCH_DOCUMENT`` in order: plain
+    strings are literals, ``("col", name)`` pairs are column values (NULL
+    becomes an empty string). The same definition renders the SQL used to
+    materialize the documents and the Python used by local tooling, so the
+    two never drift apart.
+    """
+
+    def __init__(self, name: str, source: str, key: str, document: List, attributes: List[str],
+                 search_attributes: List[str], documents_table: str, service: str,
+                 where: Optional[str] = None):
+        self.name = name
+        self.source = source
+        self.key = key
+        self.document = document
+        self.attributes = attributes
+        # Subset of attributes the search service can filter on
+        self.search_attributes = search_attributes
+        self.documents_table = documents_table
+        self.service = service
+        self.where = where
+
+    @property
+    def columns(self) -> List[str]:
+        return [self.key] + [c for c in self.attributes if c != self.key]
+
+
+SOP_DOCUMENTS = SearchDocumentSpec(
+    name="sop",
+    source="hospital_sop",
+    key="SOP_ID",
+    document=[("col", "SOP_TITLE"), " - ", ("col", "SOP_CATEGORY"), ". ",
+              "Department: ", ("col", "DEPARTMENT"), ". ", ("col", "SOP_CONTENT")],
+    # LAST_UPDATED is left out: it is restamped on every load and would mark all rows changed
+    attributes=["SOP_TITLE", "SOP_CATEGORY", "DEPARTMENT", "SOP_CONTENT", "VERSION"],
+    search_attributes=["SOP_ID", "SOP_TITLE", "SOP_CATEGORY", "DEPARTMENT", "SOP_CONTENT"],
+    documents_table="sop_search_documents",
+    service="sop_search_service",
+)
+
+FACILITY_DOCUMENTS = SearchDocumentSpec(
+    name="facility",
+    source="hospital_facilities",
+    key="FACILITY_ID",
+    document=[("col", "FACILITY_NAME"), " is a ", ("col", "FACILITY_TYPE"),
+              " located at ", ("col", "LOCATION"), ". Capacity: ", ("col", "CAPACITY"),
+              ". Operating hours: ", ("col", "OPERATING_HOURS"), ". Equipment: ", ("col", "EQUIPMENT_LIST"),
+              ". Contact: ", ("col", "CONTACT_INFO")],
+    attributes=["FACILITY_NAME", "FACILITY_TYPE", "LOCATION", "CAPACITY", "CURRENT_USAGE",
+                "OPERATING_HOURS", "CONTACT_INFO", "STATUS"],
+    search_attributes=["FACILITY_ID", "FACILITY_NAME", "FACILITY_TYPE", "LOCATION", "CAPACITY", "OPERATING_HOURS"],
+    documents_table="facility_search_documents",
+    service="facility_search_service",
+    where="STATUS = 'OPERATIONAL'",
+)
+
+SEARCH_DOCUMENT_SPECS: Dict[str, SearchDocumentSpec] = {
+    spec.name: spec for spec in (SOP_DOCUMENTS, FACILITY_DOCUMENTS)
+}
+
+
+def document_expression_sql(spec: SearchDocumentSpec) -> str:
+    """``SEARCH_DOCUMENT`` as a SQL expression over the source columns"""
+    parts = []
+    for part in spec.document:
+        if isinstance(part, tuple):
+            parts.append(f"COALESCE(TO_VARCHAR({part[1]}), '')")
+        else:
+            parts.append(sql_literal(part))
+    return " || ".join(parts)
+
+
+def build_document(spec: SearchDocumentSpec, record: dict) -> str:
+    """``SEARCH_DOCUMENT`` for one source row, built locally"""
+    return "".join(
+        ("" if record.get(part[1]) is None else str(record.get(part[1]))) if isinstance(part, tuple) else part
+        for part in spec.document
+    )
+
+
+def documents_sql(spec: SearchDocumentSpec) -> str:
+    """SELECT of every current document with its content hash
+
+    The hash covers the document and all attributes, so any change the
+    search service would serve marks the row as changed.
+    """
+    hashed = " || '\\x1f' || ".join(
+        ["SEARCH_DOCUMENT"] + [f"COALESCE(TO_VARCHAR({c}), '')" for c in spec.columns]
+    )
+    where = f"WHERE {spec.where}" if spec.where else ""
+    return f"""
+    SELECT *, SHA2({hashed}, 256) as CONTENT_HASH
+    FROM (
+        SELECT {", ".join(spec.columns)},
+               {document_expression_sql(spec)} as SEARCH_DOCUMENT
+        FROM {spec.source}
+        {where}
+    )
+    """
+
+
+def create_documents_table_sql(spec: SearchDocumentSpec) -> str:
+    # Column types are taken from the source; CHANGE_TRACKING lets the search
+    # service refresh incrementally from the rows the MERGE touched
+    return f"""
+    CREATE TABLE IF NOT EXISTS {spec.documents_table}
+    CHANGE_TRACKING = TRUE
+    AS SELECT *, CURRENT_TIMESTAMP() as UPDATED_AT FROM ({documents_sql(spec)})
+    """
+
+
+def merge_documents_sql(spec: SearchDocumentSpec) -> str:
+    """MERGE that inserts new documents and rewrites only rows whose hash changed"""
+    assignments = ", ".join(f"{c} = s.{c}" for c in spec.columns[1:] + ["SEARCH_DOCUMENT", "CONTENT_HASH"])
+    insert_columns = spec.columns + ["SEARCH_DOCUMENT", "CONTENT_HASH"]
+    return f"""
+    MERGE INTO {spec.documents_table} t
+    USING ({documents_sql(spec)}) s
+    ON t.{spec.key} = s.{spec.key}
+    WHEN MATCHED AND t.CONTENT_HASH <> s.CONTENT_HASH THEN UPDATE SET
+        {assignments}, UPDATED_AT = CURRENT_TIMESTAMP()
+    WHEN NOT MATCHED THEN INSERT ({", ".join(insert_columns)}, UPDATED_AT)
+    VALUES ({", ".join(f"s.{c}" for c in insert_columns)}, CURRENT_TIMESTAMP())
+    """
+
+
+def delete_stale_documents_sql(spec: SearchDocumentSpec) -> str:
+    """DELETE documents whose source row is gone or no longer matches the filter"""
+    return f"""
+    DELETE FROM {spec.documents_table} t
+    WHERE NOT EXISTS (
+        SELECT 1 FROM ({documents_sql(spec)}) s WHERE s.{spec.key} = t.{spec.key}
+    )
+    """
+
+
+def create_search_service_sql(spec: SearchDocumentSpec, warehouse: str, target_lag: str = "1 minute") -> str:
+    """CREATE CORTEX SEARCH SERVICE over the materialized documents table"""
+    return f"""
+CREATE OR REPLACE CORTEX SEARCH SERVICE {spec.service}
+ON SEARCH_DOCUMENT
+ATTRIBUTES {", ".join(spec.search_attributes)}
+WAREHOUSE = {warehouse}
+TARGET_LAG = '{target_lag}'
+AS (
+    SELECT {", ".join(spec.columns)}, SEARCH_DOCUMENT
+    FROM {spec.documents_table}
+)
+"""
+
+
+def refresh_search_documents(sf_helper, spec: SearchDocumentSpec) -> Dict[str, int]:
+    """Bring ``spec.documents_table`` up to date with its source; returns row counts
+
+    Unchanged rows are not touched, so after a reload the search service
+    only re-indexes documents whose content actually changed.
+    """
+    with span("search_documents.refresh", table=spec.documents_table) as s:
+        sf_helper.execute_query(create_documents_table_sql(spec))
+        merged = sf_helper.execute_query(merge_documents_sql(spec))
+        deleted = sf_helper.execute_query(delete_stale_documents_sql(spec))
+        counts = {
+            "inserted": int(merged.iloc[0, 0]) if not merged.empty else 0,
+            "updated": int(merged.iloc[0, 1]) if not merged.empty and merged.shape[1] > 1 else 0,
+            "deleted": int(deleted.iloc[0, 0]) if not deleted.empty else 0,
+        }
+        s.set(**counts)
+    print(f"✓ Refreshed {spec.documents_table}: {counts['inserted']} inserted, "
+          f"{counts['updated']} updated, {counts['deleted']} deleted")
+    return counts
+
+
+def load_search_documents(sf_helper, spec: SearchDocumentSpec, columns: Optional[List[str]] = None):
+    """Read materialized documents for local tooling"""
+    selected = ", ".join(columns or spec.columns + ["SEARCH_DOCUMENT"])
+    return sf_helper.execute_query(f"SELECT {selected} FROM {spec.documents_table}")
@@ -0,0 +1,352 @@
+import json
+import re
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from src.agents.tool_executor import ToolExecutor, ToolRun
+from src.utils.instrumentation import span
+from src.utils.query_cache import QueryCache, completion_cache_key
+from src.utils.streaming import CompletionStream
+
+
+class StaffAdminTools:
+    """Custom tools for Staff Admin Agent"""
+
+    def __init__(self, sf_helper, availability_index=None):
+        self.sf_helper = sf_helper
+        # Optional DoctorAvailabilityIndex; when set, schedule lookups skip the warehouse.
+        # One loaded with from_snowflake re-syncs itself as appointments change.
+        self.availability_index = availability_index
+
+    def search_sop(self, keyword: str = None, category: str = None) -> dict:
+        """Search hospital SOPs by keyword or category"""
+        conditions = []
+
+        if keyword:
+            conditions.append(f"(SOP_TITLE ILIKE '%{keyword}%' OR SOP_CONTENT ILIKE '%{keyword}%')")
+        if category:
+            conditions.append(f"SOP_CATEGORY = '{category}'")
+
+        where_clause = " AND ".join(conditions) if conditions else "1=1"
+
+        query = f"""
+        SELECT
+            SOP_ID,
+            SOP_CATEGORY,
+            SOP_TITLE,
+            SOP_CONTENT,
+            DEPARTMENT,
+            LAST_UPDATED,
+            VERSION
+        FROM hospital_sop
+        WHERE {where_clause}
+        ORDER BY LAST_UPDATED DESC
+        LIMIT 5
+        """
+
+        result = self.sf_helper.execute_query(query)
+        return {
+            "success": True,
+            "count": len(result),
+            "sops": result.to_dict('records')
+        }
+
+    def get_doctor_schedule(self, day: str = None, specialization: str = None,
+                            doctor_name: str = None, start_time: str = None,
+                            end_time: str = None) -> dict:
+        """Get doctor schedules with filters
+
+        ``start_time``/``end_time`` ("HH:MM") keep only slots overlapping that window.
+        """
+        if self.availability_index is not None:
+            slots = self.availability_index.find(
+                specialization=specialization, day=day, start=start_time, end=end_time,
+                doctor_name=doctor_name, limit=10
+            )
+            return {
+                "success": True,
+                "count": len(slots),
+                "schedules": [slot.to_record() for slot in slots]
+            }
+
+        conditions = ["STATUS = 'AVAILABLE'"]
+
+        if day:
+            conditions.append(f"DAY_OF_WEEK = '{day}'")
+        if specialization:
+            conditions.append(f"SPECIALIZATION ILIKE '%{specialization}%'")
+        if doctor_name:
+            conditions.append(f"DOCTOR_NAME ILIKE '%{doctor_name}%'")
+        if start_time:
+            conditions.append(f"END_TIME > '{start_time}'")
+        if end_time:
+            conditions.append(f"START_TIME < '{end_time}'")
+
+        where_clause = " AND ".join(conditions)
+
+        query = f"""
+        SELECT
+            SCHEDULE_ID,
+            DOCTOR_NAME,
+            SPECIALIZATION,
+            DAY_OF_WEEK,
+            START_TIME,
+            END_TIME,
+            ROOM_NUMBER,
+            MAX_PATIENTS,
+            BOOKED_PATIENTS,
+            (MAX_PATIENTS - BOOKED_PATIENTS) as AVAILABLE_SLOTS
+        FROM doctor_schedule
+        WHERE {where_clause}
+        ORDER BY DAY_OF_WEEK, START_TIME
+        LIMIT 10
+        """
+
+        result = self.sf_helper.execute_query(query)
+        return {
+            "success": True,
+            "count": len(result),
+            "schedules": result.to_dict('records')
+        }
+
+    def check_facility_availability(self, facility_type: str = None,
+                                    location: str = None) -> dict:
+        """Check facility availability"""
+        conditions = ["STATUS = 'OPERATIONAL'"]
+
+        if facility_type:
+            conditions.append(f"FACILITY_TYPE ILIKE '%{facility_type}%'")
+        if location:
+            conditions.append(f"LOCATION ILIKE '%{location}%'")
+
+        where_clause = " AND ".join(conditions)
+
+        query = f"""
+        SELECT
+            FACILITY_ID,
+            FACILITY_NAME,
+            FACILITY_TYPE,
+            LOCATION,
+            CAPACITY,
+            CURRENT_USAGE,
+            (CAPACITY - CURRENT_USAGE) as AVAILABLE_CAPACITY,
+            OPERATING_HOURS,
+            CONTACT_INFO,
+            STATUS
+        FROM hospital_facilities
+        WHERE {where_clause}
+        ORDER BY AVAILABLE_CAPACITY DESC
+        LIMIT 10
+        """
+
+        result = self.sf_helper.execute_query(query)
+        return {
+            "success": True,
+            "count": len(result),
+            "facilities": result.to_dict('records')
+        }
+
+    def get_department_summary(self) -> dict:
+        """Get summary of hospital departments and their resources"""
+        query = """
+                SELECT DEPARTMENT,
+                       COUNT(*)          as SOP_COUNT,
+                       MAX(LAST_UPDATED) as LATEST_UPDATE
+                FROM hospital_sop
+                GROUP BY DEPARTMENT
+                ORDER BY SOP_COUNT DESC \
+                """
+
+        result = self.sf_helper.execute_query(query)
+        return {
+            "success": True,
+            "departments": result.to_dict('records')
+        }
+
+
+def build_agent_prompt(user_query: str, tool_results: dict = None) -> str:
+    """Build prompt for the Staff Admin Agent"""
+
+    system_context = """You are AURA Staff Admin Assistant, an AI agent helping hospital administrative staff.
+
+    Your capabilities:
+    1. Search and explain hospital Standard Operating Procedures (SOPs)
+    2. Check doctor schedules and availability
+    3. Verify facility availability and resources
+    4. Provide administrative guidance
+
+    Guidelines:
+    - Be professional and concise
+    - Always cite specific SOP IDs, doctor names, or facility IDs when providing information
+    - If you don't have information, admit it and suggest alternatives
+    - Format responses clearly with bullet points when listing multiple items
+    - Include relevant details like room numbers, timings, and contact information
+
+    Context: You have access to hospital database with SOPs, doctor schedules, and facility information.
+    Current date: {current_date}
+""".format(current_date=datetime.now().strftime("%A, %B %d, %Y"))
+
+    if tool_results:
+        context_data = "\n\nAvailable Data:\n"
+        for key, value in tool_results.items():
+            context_data += f"\n{key}:\n{json.dumps(value, indent=2, default=str)}\n"
+    else:
+        context_data = ""
+
+    full_prompt = f"""{system_context}{context_data}
+
+User Query: {user_query}
+
+Response:"""
+
+    return full_prompt
+
+
+# Routing vocabularies used by StaffAdminAgent.route
+SOP_WORDS = ['sop', 'procedure', 'protocol', 'guideline']
+SOP_CATEGORIES = ['patient care', 'emergency', 'administrative', 'safety', 'quality']
+SOP_KEYWORDS = ['admission', 'discharge', 'appointment', 'emergency', 'medication']
+SCHEDULE_WORDS = ['doctor', 'schedule', 'appointment', 'available']
+DAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+SPECIALIZATIONS = ['cardiologist', 'pediatrician', 'orthopedist', 'dermatologist',
+                   'neurologist', 'gynecologist', 'psychiatrist']
+FACILITY_WORDS = ['facility', 'room', 'equipment', 'operating room', 'icu']
+FACILITY_TYPES = ['operating room', 'icu', 'emergency room', 'x-ray', 'mri', 'ct scanner', 'laboratory']
+TIME_BOUND_PATTERN = re.compile(r"\b(after|before)\s+(\d{1,2})(?::(\d{2}))?\s*(am|pm)?")
+
+
+class StaffAdminAgent:
+    """Keyword-routed Staff Admin agent: route -> tools -> prompt build -> complete
+
+    Each stage of a turn is recorded as a span (``agent.route``,
+    ``agent.tools``, ``agent.prompt_build``, ``cortex.complete_stream``) under
+    a parent ``agent.turn`` span when tracing is enabled. The completion span
+    carries ``time_to_first_token_ms``.
+
+    With a ``completion_cache``, answers are stored per (model, prompt); a
+    repeated question whose tool results are unchanged is answered from it.
+    """
+
+    def __init__(self, sf_helper, tools: StaffAdminTools = None, model: str = "mistral-7b",
+                 executor: ToolExecutor = None, completion_cache: Optional[QueryCache] = None):
+        self.sf_helper = sf_helper
+        self.tools = tools or StaffAdminTools(sf_helper)
+        self.model = model
+        self.executor = executor or ToolExecutor(self.tools)
+        self.completion_cache = completion_cache
+        self.last_tool_run: Optional[ToolRun] = None
+
+    @staticmethod
+    def route(user_query: str) -> Dict[str, Tuple[str, dict]]:
+        """Detect intents and return ``{result_key: (tool_name, kwargs)}``"""
+        query_lower = user_query.lower()
+        plan = {}
+
+        if any(word in query_lower for word in SOP_WORDS):
+            # Extract category if mentioned
+            detected_category = next((cat for cat in SOP_CATEGORIES if cat in query_lower), None)
+
+            if detected_category:
+                plan['sop_search'] = ('search_sop', {'category': detected_category.title()})
+            else:
+                # Search by keyword
+                detected_keyword = next((kw for kw in SOP_KEYWORDS if kw in query_lower), None)
+                if detected_keyword:
+                    plan['sop_search'] = ('search_sop', {'keyword': detected_keyword})
+
+        detected_day = next((day for day in DAYS if day in query_lower), None)
+        detected_spec = next((spec for spec in SPECIALIZATIONS if spec in query_lower), None)
+
+        bounds = {}
+        for word, hour, minute, meridiem in TIME_BOUND_PATTERN.findall(query_lower):
+            hour, minute = int(hour), int(minute or 0)
+            if meridiem:
+                if not 1 <= hour <= 12:
+                    continue
+                # 12 am is midnight, 12 pm is noon
+                hour = hour % 12 + (12 if meridiem == 'pm' else 0)
+            if hour > 23 or minute > 59:
+                continue
+            bounds['start_time' if word == 'after' else 'end_time'] = f"{hour:02d}:{minute:02d}"
+
+        # A specialization or time bound is a schedule question on its own
+        # ("free cardiologists Tuesday after 2 pm"); a bare day needs a schedule word
+        if detected_spec or bounds or (detected_day and any(word in query_lower for word in SCHEDULE_WORDS)):
+            plan['doctor_schedule'] = ('get_doctor_schedule', {
+                'day': detected_day.title() if detected_day else None,
+                'specialization': detected_spec.title() if detected_spec else None,
+                **bounds
+            })
+
+        if any(word in query_lower for word in FACILITY_WORDS):
+            detected_facility = next((ft for ft in FACILITY_TYPES if ft in query_lower), None)
+
+            if detected_facility:
+                plan['facility_availability'] = ('check_facility_availability', {
+                    'facility_type': detected_facility.title()
+                })
+
+        return plan
+
+    def run_tools(self, plan: Dict[str, Tuple[str, dict]]) -> dict:
+        """Run the planned tool calls concurrently; late or failing tools become notes
+
+        Per-tool latencies and dropped tools of the last turn are kept in
+        ``last_tool_run``.
+        """
+        self.last_tool_run = self.executor.execute(plan)
+        return self.last_tool_run.results
+
+    def build_prompt(self, user_query: str, use_tools: bool = True) -> str:
+        """Route the query, run the selected tools and build the Cortex prompt"""
+        tool_results = {}
+        self.last_tool_run = None
+        if use_tools:
+            with span("agent.route") as s:
+                plan = self.route(user_query)
+                s.set(tools=",".join(name for name, _ in plan.values()))
+            with span("agent.tools", num_tools=len(plan)):
+                tool_results = self.run_tools(plan)
+
+        # Build prompt with tool results
+        with span("agent.prompt_build") as s:
+            prompt = build_agent_prompt(user_query, tool_results if tool_results else None)
+            s.set(prompt_chars=len(prompt))
+        return prompt
+
+    def respond_stream(self, user_query: str, use_tools: bool = True) -> CompletionStream:
+        """Answer a user query as a token stream
+
+        Tools run before this returns; iterate the result (or ``async for``)
+        to receive the answer as it is generated. ``first_token_s`` on the
+        stream holds the time to first token once it has arrived.
+        """
+        prompt = self.build_prompt(user_query, use_tools)
+        if self.completion_cache is None:
+            return self.sf_helper.cortex_complete_stream(prompt, model=self.model)
+
+        key = completion_cache_key(self.model, prompt)
+        found, text = self.completion_cache.lookup(key)
+        if found:
+            return CompletionStream([text], name="cortex.complete_cached", model=self.model)
+        stream = self.sf_helper.cortex_complete_stream(prompt, model=self.model)
+
+        def store(done: CompletionStream):
+            # A stream closed early holds a partial answer; only cache complete ones
+            if done.error is None and not done.cancelled:
+                self.completion_cache.put(key, done.text)
+
+        stream.add_done_callback(store)
+        return stream
+
+    def respond(self, user_query: str, use_tools: bool = True) -> str:
+        """Answer a user query, calling tools selected by keyword detection"""
+        with span("agent.turn", model=self.model) as turn:
+            stream = self.respond_stream(user_query, use_tools)
+            try:
+                response = stream.collect()
+            finally:
+                stream.close()
+            turn.set(response_chars=len(response), time_to_first_token_s=stream.first_token_s)
+
+        return response
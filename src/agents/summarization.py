@@ -0,0 +1,239 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+from src.utils.admission import CHARS_PER_TOKEN, estimate_tokens
+from src.utils.concurrency import map_concurrently
+from src.utils.instrumentation import span
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+SUMMARY_CACHE_TABLE = "sop_summary_cache"
+
+
+def split_text(text: str, token_budget: int) -> List[str]:
+    """Split a single oversized text into pieces of at most ``token_budget`` tokens
+
+    Splits on sentence boundaries where possible.
+    """
+    max_chars = token_budget * CHARS_PER_TOKEN
+    pieces, current = [], ""
+    for sentence in text.replace("\n", " ").split(". "):
+        sentence = sentence if sentence.endswith(".") else sentence + "."
+        while len(sentence) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if current and len(current) + len(sentence) + 1 > max_chars:
+            pieces.append(current)
+            current = ""
+        current = f"{current} {sentence}" if current else sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def pack_by_tokens(texts: List[str], token_budget: int) -> List[List[str]]:
+    """Greedily pack texts, in order, into groups of at most ``token_budget`` tokens"""
+    groups, current, used = [], [], 0
+    for text in texts:
+        tokens = estimate_tokens(text)
+        if current and used + tokens > token_budget:
+            groups.append(current)
+            current, used = [], 0
+        current.append(text)
+        used += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _raise_errors(results: list) -> list:
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
+    return results
+
+
+def hierarchical_reduce(texts: List[str], combine_fn: Callable[[str], str], token_budget: int,
+                        max_workers: int = 4, separator: str = "\n\n") -> str:
+    """Combine texts with ``combine_fn`` level by level until one result remains
+
+    Each level packs the inputs into chunks of at most ``token_budget`` tokens
+    and combines the chunks concurrently. When no two inputs fit in one chunk
+    (``combine_fn`` did not shrink them enough), adjacent pairs are combined
+    over budget instead, so every level reduces the count and the loop ends.
+    """
+    level = 0
+    while True:
+        groups = pack_by_tokens(texts, token_budget)
+        if len(groups) >= len(texts) > 1:
+            print(f"Note: reduce level {level} inputs exceed the {token_budget}-token budget; combining pairs")
+            groups = [texts[i:i + 2] for i in range(0, len(texts), 2)]
+        if len(groups) == 1:
+            with span("reduce.level", level=level, inputs=len(texts)):
+                return combine_fn(separator.join(groups[0]))
+        with span("reduce.level", level=level, inputs=len(texts), chunks=len(groups)):
+            texts = _raise_errors(map_concurrently(
+                lambda group: combine_fn(separator.join(group)), groups, max_workers
+            ))
+        level += 1
+
+
+class SummaryCache:
+    """Per-document summaries keyed on (document ID, version)
+
+    Kept in memory; ``load``/``flush`` persist entries to the
+    ``sop_summary_cache`` table so that later runs also skip unchanged SOPs.
+    """
+
+    def __init__(self, sf_helper=None, table: str = SUMMARY_CACHE_TABLE):
+        self.sf_helper = sf_helper
+        self.table = table
+        self._entries: Dict[Tuple[str, str], str] = {}
+        self._pending: Dict[Tuple[str, str], str] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, doc_id: str, version: str) -> Optional[str]:
+        return self._entries.get((doc_id, version))
+
+    def put(self, doc_id: str, version: str, summary: str):
+        with self._lock:
+            self._entries[(doc_id, version)] = summary
+            self._pending[(doc_id, version)] = summary
+
+    def load(self):
+        """Load previously stored summaries from Snowflake (missing table is ignored)"""
+        try:
+            df = self.sf_helper.execute_query(f"SELECT DOC_ID, VERSION, SUMMARY FROM {self.table}")
+        except Exception as e:
+            print(f"Note: summary cache not loaded ({e})")
+            return
+        with self._lock:
+            for row in df.to_dict("records"):
+                self._entries[(row["DOC_ID"], row["VERSION"])] = row["SUMMARY"]
+        print(f"✓ Loaded {len(df)} cached summaries from {self.table}")
+
+    def flush(self):
+        """Append summaries created since the last flush to the cache table"""
+        import pandas as pd
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending or self.sf_helper is None:
+            return
+        df = pd.DataFrame(
+            [{"DOC_ID": doc_id, "VERSION": version, "SUMMARY": summary}
+             for (doc_id, version), summary in pending.items()]
+        )
+        self.sf_helper.load_data_to_table(df, self.table)
+
+
+class MapReduceSummarizer:
+    """Summarize large document sets with bounded-parallel map and hierarchical reduce
+
+    1. Map: each document gets a summary, cached on (ID, version). Documents
+       shorter than ``min_tokens_to_summarize`` are used verbatim; longer ones
+       are split to the token budget and summarized concurrently.
+    2. Reduce: summaries are packed into chunks of ``chunk_token_budget``
+       tokens and summarized concurrently, level by level, until one chunk
+       remains; that chunk is summarized once more into the final answer.
+
+    ``summarize_fn`` defaults to ``sf_helper.cortex_summarize``.
+    """
+
+    def __init__(self, sf_helper=None, summarize_fn: Callable[[str], str] = None,
+                 cache: SummaryCache = None, max_workers: int = 4,
+                 chunk_token_budget: int = 3000, min_tokens_to_summarize: int = 400,
+                 reduce_cache_size: int = 256):
+        self.summarize_fn = summarize_fn or sf_helper.cortex_summarize
+        self.cache = cache if cache is not None else SummaryCache(sf_helper)
+        self.max_workers = max_workers
+        self.chunk_token_budget = chunk_token_budget
+        self.min_tokens_to_summarize = min_tokens_to_summarize
+        self._reduce_cache: "OrderedDict[str, str]" = OrderedDict()
+        self._reduce_cache_size = reduce_cache_size
+        self._lock = threading.Lock()
+
+    def _summarize_cached(self, text: str) -> str:
+        """Summarize ``text``, reusing the result for identical input"""
+        key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        with self._lock:
+            if key in self._reduce_cache:
+                self._reduce_cache.move_to_end(key)
+                return self._reduce_cache[key]
+        summary = self.summarize_fn(text)
+        with self._lock:
+            self._reduce_cache[key] = summary
+            while len(self._reduce_cache) > self._reduce_cache_size:
+                self._reduce_cache.popitem(last=False)
+        return summary
+
+    def _document_pieces(self, text: str) -> List[str]:
+        """Texts to summarize for one document (empty when it is short enough to use verbatim)"""
+        if estimate_tokens(text) <= self.min_tokens_to_summarize:
+            return []
+        pieces = split_text(text, self.chunk_token_budget)
+        return [text] if len(pieces) == 1 else pieces
+
+    def map_documents(self, docs: List[dict], id_key: str, version_key: str,
+                      text_fn: Callable[[dict], str]) -> List[str]:
+        """Return one summary per document, summarizing only cache misses
+
+        The pieces of every missed document go through a single bounded pool,
+        so at most ``max_workers`` summaries run at once.
+        """
+        summaries: List[Optional[str]] = [None] * len(docs)
+        misses = []
+        for i, doc in enumerate(docs):
+            cached = self.cache.get(doc[id_key], doc[version_key])
+            if cached is not None:
+                summaries[i] = cached
+            else:
+                misses.append(i)
+
+        with span("summarize.map", documents=len(docs), cache_hits=len(docs) - len(misses)) as s:
+            texts = {i: text_fn(docs[i]) for i in misses}
+            work = [(i, piece) for i in misses for piece in self._document_pieces(texts[i])]
+            s.set(pieces=len(work))
+            results = map_concurrently(lambda item: self.summarize_fn(item[1]), work, self.max_workers)
+            parts: Dict[int, list] = {}
+            for (i, _), result in zip(work, results):
+                parts.setdefault(i, []).append(result)
+
+            for i in misses:
+                doc_parts = parts.get(i)
+                if doc_parts is None:
+                    summaries[i] = texts[i]
+                elif any(isinstance(part, Exception) for part in doc_parts):
+                    # Fall back to the raw text so one failure does not sink the category
+                    error = next(part for part in doc_parts if isinstance(part, Exception))
+                    print(f"Summarize error for {docs[i][id_key]}: {error}")
+                    summaries[i] = texts[i]
+                    continue
+                else:
+                    summaries[i] = "\n".join(doc_parts)
+                self.cache.put(docs[i][id_key], docs[i][version_key], summaries[i])
+        return summaries
+
+    def reduce(self, texts: List[str]) -> str:
+        """Hierarchically reduce texts to a single summary"""
+        return hierarchical_reduce(texts, self._summarize_cached, self.chunk_token_budget, self.max_workers)
+
+    def summarize_documents(self, docs: List[dict], id_key: str = "SOP_ID", version_key: str = "VERSION",
+                            text_fn: Callable[[dict], str] = None) -> str:
+        """Map-reduce summary of ``docs`` (dicts with ID, version and text fields)"""
+        text_fn = text_fn or (lambda doc: f"{doc['SOP_TITLE']}: {doc['SOP_CONTENT']}")
+        with span("summarize.documents", documents=len(docs)):
+            summaries = self.map_documents(docs, id_key, version_key, text_fn)
+            return self.reduce(summaries)
+
+    def summarize_frame(self, df: "pd.DataFrame", **kwargs) -> str:
+        return self.summarize_documents(df.to_dict("records"), **kwargs)
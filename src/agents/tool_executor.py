@@ -0,0 +1,141 @@
+import contextvars
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.utils.instrumentation import span
+from src.utils.query_cache import QueryCache, tool_cache_key
+
+# Seconds a tool may run before its result is dropped from the turn
+DEFAULT_DEADLINE_S = 8.0
+
+
+class ToolRun:
+    """Outcome of one fan-out: results plus what was dropped and how long each call took"""
+
+    def __init__(self):
+        self.results: Dict[str, dict] = {}
+        self.latencies: Dict[str, float] = {}
+        self.timed_out: List[str] = []
+        # Optional keys abandoned because every required call had finished
+        self.dropped_optional: List[str] = []
+        self.errors: Dict[str, str] = {}
+        # Keys answered from the tool-result cache without calling the tool
+        self.cached: List[str] = []
+        self.wall_s = 0.0
+
+    @property
+    def complete(self) -> bool:
+        return not self.timed_out and not self.dropped_optional and not self.errors
+
+
+class ToolExecutor:
+    """Run a tool plan concurrently with per-tool deadlines
+
+    Every planned call is submitted at once to a shared thread pool, so a
+    multi-intent query costs roughly its slowest tool instead of the sum.
+    ``execute`` returns as soon as every required call has finished or
+    passed its deadline. A call that misses its deadline or raises is
+    replaced by a short note, so the prompt tells the model the data is
+    missing instead of the turn blocking on it. Abandoned calls keep
+    running on their worker thread; their results are discarded.
+
+    ``deadlines`` maps tool names to seconds and overrides ``default_deadline``.
+    With a ``cache``, successful results are stored per tool name and
+    arguments and repeated calls are answered without a warehouse round trip.
+    The Snowpark session must be safe to share between threads
+    (``snowflake-snowpark-python`` >= 1.24).
+    """
+
+    def __init__(self, tools, max_workers: int = 4, default_deadline: float = DEFAULT_DEADLINE_S,
+                 deadlines: Optional[Dict[str, float]] = None, cache: Optional[QueryCache] = None):
+        self.tools = tools
+        self.cache = cache
+        self.default_deadline = default_deadline
+        self.deadlines = dict(deadlines or {})
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="aura-tool")
+
+    def deadline_for(self, tool_name: str) -> float:
+        return self.deadlines.get(tool_name, self.default_deadline)
+
+    def _call(self, key: str, tool_name: str, kwargs: dict) -> Tuple[dict, float]:
+        start = time.perf_counter()
+        attributes = {"cache": "miss"} if self.cache is not None else {}
+        with span(f"tool.{tool_name}", result_key=key, **attributes) as s:
+            result = getattr(self.tools, tool_name)(**kwargs)
+            s.set(count=result.get("count"))
+        if self.cache is not None and result.get("success"):
+            self.cache.put(tool_cache_key(tool_name, kwargs), result)
+        return result, time.perf_counter() - start
+
+    def execute(self, plan: Dict[str, Tuple[str, dict]], required: Optional[Iterable[str]] = None) -> ToolRun:
+        """Run ``plan`` (``{result_key: (tool_name, kwargs)}``) and collect what finishes in time
+
+        ``required`` defaults to every key. Optional calls still running when
+        the required ones are done are abandoned and listed in ``dropped_optional``.
+        """
+        run = ToolRun()
+        start = time.perf_counter()
+        required = set(plan if required is None else required)
+
+        with span("tools.fanout", num_tools=len(plan)) as s:
+            futures = {}
+            for key, (tool_name, kwargs) in plan.items():
+                if self.cache is not None:
+                    found, result = self.cache.lookup(tool_cache_key(tool_name, kwargs))
+                    if found:
+                        with span(f"tool.{tool_name}", result_key=key, cache="hit", count=result.get("count")):
+                            pass
+                        run.results[key], run.latencies[key] = result, 0.0
+                        run.cached.append(key)
+                        continue
+                # Copy the context inside the fan-out span so tool spans nest under it
+                ctx = contextvars.copy_context()
+                future = self._pool.submit(ctx.run, self._call, key, tool_name, kwargs)
+                futures[future] = (key, tool_name, start + self.deadline_for(tool_name))
+
+            pending = set(futures)
+            while pending and any(futures[f][0] in required for f in pending):
+                now = time.perf_counter()
+                for future in [f for f in pending if futures[f][2] <= now and not f.done()]:
+                    pending.discard(future)
+                    self._drop(run, future, *futures[future][:2], now - start)
+                if not pending:
+                    break
+                next_deadline = min(futures[f][2] for f in pending)
+                done, pending = wait(pending, timeout=max(0.0, next_deadline - now),
+                                     return_when=FIRST_COMPLETED)
+                for future in done:
+                    key, tool_name, _ = futures[future]
+                    try:
+                        run.results[key], run.latencies[key] = future.result()
+                    except Exception as e:
+                        run.latencies[key] = time.perf_counter() - start
+                        run.errors[key] = f"{type(e).__name__}: {e}"
+                        run.results[key] = {"status": "unavailable",
+                                            "note": f"{tool_name} failed ({e}); data omitted"}
+
+            for future in pending:
+                self._drop(run, future, *futures[future][:2], time.perf_counter() - start, optional=True)
+            # Keep the plan's order so the prompt does not depend on which tool finished first
+            run.results = {key: run.results[key] for key in plan if key in run.results}
+            run.wall_s = time.perf_counter() - start
+            s.set(cached=len(run.cached), timed_out=",".join(run.timed_out),
+                  dropped_optional=",".join(run.dropped_optional), errors=len(run.errors),
+                  wall_ms=round(run.wall_s * 1000, 3))
+        return run
+
+    @staticmethod
+    def _drop(run: ToolRun, future, key: str, tool_name: str, elapsed: float, optional: bool = False):
+        future.cancel()
+        run.latencies[key] = elapsed
+        if optional:
+            run.dropped_optional.append(key)
+            note = f"{tool_name} was skipped to answer without waiting for it; data omitted"
+        else:
+            run.timed_out.append(key)
+            note = f"{tool_name} did not finish within {elapsed:.1f}s; data omitted"
+        run.results[key] = {"status": "unavailable", "note": note}
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
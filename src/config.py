@@ -1,35 +1,77 @@
-from dotenv import load_dotenv
 import os
-from typing import Dict
+from functools import lru_cache
+from typing import Dict, List
 
-load_dotenv()
+_env_loaded = False
+
+
+def load_env(reload: bool = False):
+    """Load variables from .env once, on first use rather than at import time
+
+    ``reload=True`` reads .env again and lets its values replace ones already set.
+    """
+    global _env_loaded
+    if reload or not _env_loaded:
+        from dotenv import load_dotenv
+
+        load_dotenv(override=reload)
+        _env_loaded = True
+
+
+@lru_cache(maxsize=1)
+def _connection_params() -> Dict[str, str]:
+    load_env()
+    return {
+        "account": os.getenv("SNOWFLAKE_ACCOUNT"),
+        "user": os.getenv("SNOWFLAKE_USER"),
+        "password": os.getenv("SNOWFLAKE_PASSWORD"),
+        "role": os.getenv("SNOWFLAKE_ROLE", "DEV_ROLE"),
+        "warehouse": os.getenv("SNOWFLAKE_WAREHOUSE", "TEST_WAREHOUSE"),
+        "database": os.getenv("SNOWFLAKE_DATABASE", "TEST_DATABASE"),
+        "schema": os.getenv("SNOWFLAKE_SCHEMA", "TEST_SCHEMA"),
+    }
 
 
 class SnowflakeConfig:
-    """Snowflake configuration manager"""
+    """Snowflake configuration manager
+
+    Values are resolved from the environment (and .env) on first access and
+    cached; call ``SnowflakeConfig.reload()`` after changing the environment.
+    """
 
     @staticmethod
     def get_connection_params() -> Dict[str, str]:
         """Get Snowflake connection parameters"""
-        return {
-            "account": os.getenv("SNOWFLAKE_ACCOUNT"),
-            "user": os.getenv("SNOWFLAKE_USER"),
-            "password": os.getenv("SNOWFLAKE_PASSWORD"),
-            "role": os.getenv("SNOWFLAKE_ROLE", "DEV_ROLE"),
-            "warehouse": os.getenv("SNOWFLAKE_WAREHOUSE", "TEST_WAREHOUSE"),
-            "database": os.getenv("SNOWFLAKE_DATABASE", "TEST_DATABASE"),
-            "schema": os.getenv("SNOWFLAKE_SCHEMA", "TEST_SCHEMA"),
-        }
+        return dict(_connection_params())
 
     @staticmethod
     def get_cortex_model() -> str:
         """Get Cortex model name"""
+        load_env()
         return os.getenv("CORTEX_MODEL", "mistral-7b")
 
+    @staticmethod
+    def get_trace_exporters() -> List[str]:
+        """Get tracing exporter names (json, histogram, otel); empty disables tracing"""
+        load_env()
+        value = os.getenv("AURA_TRACE_EXPORTERS", "")
+        names = [name.strip().lower() for name in value.split(",") if name.strip()]
+        unknown = [name for name in names if name not in ("json", "histogram", "otel")]
+        if unknown:
+            raise ValueError(f"Unknown AURA_TRACE_EXPORTERS entries: {', '.join(unknown)}")
+        return names
+
+    @staticmethod
+    def reload():
+        """Re-read .env (its values win over the current environment) and drop cached values"""
+        load_env(reload=True)
+        _connection_params.cache_clear()
+
 
 # Validate configuration
 def validate_config():
     """Validate that all required environment variables are set"""
+    load_env()
     required_vars = [
         "SNOWFLAKE_ACCOUNT",
         "SNOWFLAKE_USER",
@@ -464,24 +464,35 @@ class EnhancedHospitalDataGenerator:
 
         return pd.DataFrame(data)
 
-    def generate_all_data(self) -> Dict[str, pd.DataFrame]:
-        """Generate all hospital data with proper relationships"""
+    def generate_all_data(self, scale: int = 1, typed: bool = False) -> Dict[str, pd.DataFrame]:
+        """Generate all hospital data with proper relationships
+
+        ``scale`` multiplies the default record counts. SOPs and facilities are
+        capped by the size of their built-in catalogues. With ``typed=True``
+        the frames use the compact schema from ``src.data.typed_schema``
+        (categoricals, integer IDs, date/time dtypes).
+        """
 
         print("Generating SOP data...")
-        sop_df = self.generate_sop_data(num_records=50)
+        sop_df = self.generate_sop_data(num_records=50 * scale)
 
         print("Generating doctor schedules...")
-        schedule_df = self.generate_doctor_schedule(num_doctors=25)
+        schedule_df = self.generate_doctor_schedule(num_doctors=25 * scale)
 
         print("Generating facility data...")
-        facility_df = self.generate_facility_data(num_facilities=40)
+        facility_df = self.generate_facility_data(num_facilities=40 * scale)
 
         print("Generating appointments...")
-        appointments_df = self.generate_appointments(num_appointments=200)
+        appointments_df = self.generate_appointments(num_appointments=200 * scale)
 
-        return {
+        data = {
             "hospital_sop": sop_df,
             "doctor_schedule": schedule_df,
             "hospital_facilities": facility_df,
             "appointments": appointments_df
         }
+        if typed:
+            from src.data.typed_schema import to_typed
+
+            data = {table: to_typed(df, table) for table, df in data.items()}
+        return data
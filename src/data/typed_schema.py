@@ -0,0 +1,156 @@
+"""Compact, typed representation of the generated hospital tables.
+
+``to_typed`` converts a generator frame in place of its object columns:
+
+* low-cardinality text (categories, departments, days, statuses, ...) becomes
+  a pandas ``category`` (dictionary-encoded in Arrow/Parquet),
+* formatted IDs such as ``"SCH-0042"`` become integers; the prefix and width
+  live in the schema and ``format_ids`` turns them back into strings only
+  when a consumer needs the text (e.g. right before loading to Snowflake),
+* dates and timestamps become ``datetime64``; times of day become
+  ``timedelta64`` offsets from midnight (Arrow ``time64`` on export).
+
+``export_parquet`` writes the typed frames as a partitioned Parquet dataset
+(requires ``pyarrow``); date partitions are named by ISO date.
+"""
+import os
+from datetime import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class TableSchema:
+    """Typed layout of one generated table"""
+
+    def __init__(self, categories: List[str] = (), ids: Dict[str, Tuple[str, int]] = None,
+                 dates: List[str] = (), timestamps: List[str] = (), times: List[str] = (),
+                 partition_by: List[str] = ()):
+        self.categories = list(categories)
+        # Column -> (prefix, zero-padded width), e.g. "SCHEDULE_ID": ("SCH-", 4)
+        self.ids = dict(ids or {})
+        self.dates = list(dates)
+        self.timestamps = list(timestamps)
+        self.times = list(times)
+        self.partition_by = list(partition_by)
+
+
+TABLE_SCHEMAS: Dict[str, TableSchema] = {
+    "hospital_sop": TableSchema(
+        categories=["SOP_CATEGORY", "DEPARTMENT", "VERSION"],
+        ids={"SOP_ID": ("SOP-", 4)},
+        timestamps=["LAST_UPDATED"],
+        partition_by=["SOP_CATEGORY"],
+    ),
+    "doctor_schedule": TableSchema(
+        categories=["DOCTOR_NAME", "SPECIALIZATION", "DAY_OF_WEEK", "ROOM_NUMBER", "STATUS"],
+        ids={"SCHEDULE_ID": ("SCH-", 4), "DOCTOR_ID": ("DOC-", 3)},
+        times=["START_TIME", "END_TIME"],
+        partition_by=["DAY_OF_WEEK"],
+    ),
+    "hospital_facilities": TableSchema(
+        categories=["FACILITY_TYPE", "LOCATION", "OPERATING_HOURS", "EQUIPMENT_LIST", "STATUS"],
+        ids={"FACILITY_ID": ("FAC-", 4)},
+        partition_by=["FACILITY_TYPE"],
+    ),
+    "appointments": TableSchema(
+        categories=["STATUS"],
+        ids={"APPOINTMENT_ID": ("APT-", 4), "PATIENT_ID": ("PAT-", 4), "DOCTOR_ID": ("DOC-", 3),
+             "SCHEDULE_ID": ("SCH-", 4)},
+        dates=["APPOINTMENT_DATE"],
+        timestamps=["CREATED_AT"],
+        times=["APPOINTMENT_TIME"],
+        partition_by=["APPOINTMENT_DATE"],
+    ),
+}
+
+
+def _smallest_int_dtype(max_value: int) -> str:
+    for dtype, limit in (("int16", 2 ** 15 - 1), ("int32", 2 ** 31 - 1)):
+        if max_value <= limit:
+            return dtype
+    return "int64"
+
+
+def to_typed(df: "pd.DataFrame", table: str) -> "pd.DataFrame":
+    """Return a compact copy of a generator frame using ``TABLE_SCHEMAS[table]``"""
+    import pandas as pd
+
+    schema = TABLE_SCHEMAS[table]
+    typed = df.copy()
+    for column in schema.categories:
+        if column in typed:
+            typed[column] = typed[column].astype("category")
+    for column, (prefix, _) in schema.ids.items():
+        if column in typed:
+            numbers = typed[column].str.slice(len(prefix)).astype("int64")
+            typed[column] = numbers.astype(_smallest_int_dtype(int(numbers.max()) if len(numbers) else 0))
+    for column in schema.dates + schema.timestamps:
+        if column in typed:
+            typed[column] = pd.to_datetime(typed[column])
+    for column in schema.times:
+        if column in typed:
+            typed[column] = pd.to_timedelta([t.hour * 3600 + t.minute * 60 + t.second for t in typed[column]],
+                                            unit="s")
+    typed.attrs["table"] = table
+    return typed
+
+
+def format_ids(df: "pd.DataFrame", table: Optional[str] = None) -> "pd.DataFrame":
+    """Copy of a typed frame with integer IDs formatted back to ``PREFIX-0000`` strings"""
+    schema = TABLE_SCHEMAS[table or df.attrs["table"]]
+    formatted = df.copy()
+    for column, (prefix, width) in schema.ids.items():
+        if column in formatted and formatted[column].dtype.kind in "iu":
+            formatted[column] = prefix + formatted[column].astype(str).str.zfill(width)
+    return formatted
+
+
+def to_load_frame(df: "pd.DataFrame", table: Optional[str] = None) -> "pd.DataFrame":
+    """Typed frame in the column layout the Snowflake tables expect
+
+    Categories stay dictionary-encoded (Snowpark writes them through Arrow);
+    IDs become strings, times ``datetime.time`` and dates ``datetime.date``.
+    """
+    schema = TABLE_SCHEMAS[table or df.attrs["table"]]
+    loadable = format_ids(df, table)
+    for column in schema.times:
+        if column in loadable:
+            seconds = loadable[column].dt.total_seconds().astype("int64")
+            loadable[column] = [time(s // 3600, s // 60 % 60, s % 60) for s in seconds]
+    for column in schema.dates:
+        if column in loadable:
+            loadable[column] = loadable[column].dt.date
+    return loadable
+
+
+def frame_memory(df: "pd.DataFrame") -> int:
+    """Deep in-memory size in bytes (includes Python string payloads)"""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def export_parquet(frames: Dict[str, "pd.DataFrame"], root: str, compression: str = "snappy") -> Dict[str, str]:
+    """Write typed frames to ``root/<table>/``, partitioned per ``TABLE_SCHEMAS``
+
+    Returns the dataset directory per table.
+    """
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as e:
+        raise ImportError("export_parquet requires the 'pyarrow' package") from e
+
+    paths = {}
+    for table, df in frames.items():
+        schema = TABLE_SCHEMAS[table]
+        path = os.path.join(root, table)
+        partition_cols = [c for c in schema.partition_by if c in df] or None
+        for column in partition_cols or []:
+            if df[column].dtype.kind == "M":
+                # Partition directories as APPOINTMENT_DATE=2026-10-19, not a timestamp with ' ' and ':'
+                df = df.assign(**{column: df[column].dt.strftime("%Y-%m-%d")})
+        df.to_parquet(path, engine="pyarrow", compression=compression, partition_cols=partition_cols, index=False)
+        paths[table] = path
+        print(f"✓ Wrote {len(df)} rows to {path}" + (f" (partitioned by {', '.join(partition_cols)})"
+                                                      if partition_cols else ""))
+    return paths
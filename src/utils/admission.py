@@ -0,0 +1,313 @@
+"""Priority admission control and budget accounting for Cortex and warehouse calls.
+
+Usage::
+
+    from src.utils.admission import AdmissionController, background
+
+    admission = AdmissionController(
+        model_limits={"mistral-7b": (2.0, 10)},      # requests/second, burst
+        warehouse_limits={"COMPUTE_WH": (5.0, 20)},
+        token_budget=2_000_000,                      # estimated Cortex tokens per hour
+    )
+    sf_helper = SnowflakeHelper(params, admission=admission)
+
+    with background():        # bulk work yields to interactive questions
+        job.run()
+
+Calls made inside ``background()`` (including worker threads started with a
+copied context) are admitted behind interactive ones, may not dip into the
+share of each bucket reserved for interactive calls, and wait longer before
+giving up; they are also held to the budgets minus that reserve. Full
+queues and exhausted budgets raise ``AdmissionRejected``.
+"""
+import contextlib
+import contextvars
+import itertools
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from src.utils.instrumentation import span
+
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+_priority: contextvars.ContextVar = contextvars.ContextVar("aura_admission_priority", default=INTERACTIVE)
+
+# Approximate Cortex COMPLETE credits per million tokens (see the Snowflake
+# service consumption table); unknown models use DEFAULT_CREDITS_PER_M_TOKENS
+CREDITS_PER_M_TOKENS = {
+    "mistral-7b": 0.12,
+    "mixtral-8x7b": 0.22,
+    "llama3.1-8b": 0.19,
+    "llama3.1-70b": 1.21,
+    "mistral-large2": 1.95,
+    "snowflake-arctic": 0.84,
+    "summarize": 0.10,
+    "extract_answer": 0.08,
+}
+DEFAULT_CREDITS_PER_M_TOKENS = 1.0
+
+# Completion length assumed at admission time, corrected by ``Ticket.settle``
+OUTPUT_TOKEN_ESTIMATE = 256
+# Rough token estimate for budgets and chunking (Cortex models average ~4 chars/token)
+CHARS_PER_TOKEN = 4
+
+
+class AdmissionRejected(Exception):
+    """Raised when a call is shed instead of queued (full queue, timeout or budget)"""
+
+    def __init__(self, reason: str, resource: str, priority: int):
+        self.reason = reason
+        self.resource = resource
+        self.priority = priority
+        super().__init__(f"{PRIORITY_NAMES.get(priority, priority)} request for {resource} rejected: {reason}")
+
+
+@contextlib.contextmanager
+def priority(level: int):
+    """Run the enclosed calls at ``level`` (``INTERACTIVE`` or ``BACKGROUND``)"""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def background():
+    return priority(BACKGROUND)
+
+
+def current_priority() -> int:
+    return _priority.get()
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def estimate_credits(model: str, tokens: int) -> float:
+    return tokens / 1e6 * CREDITS_PER_M_TOKENS.get(model, DEFAULT_CREDITS_PER_M_TOKENS)
+
+
+class TokenBucket:
+    """Classic token bucket: ``rate`` tokens per second up to ``capacity``"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, reserve: float = 0.0, now: Optional[float] = None) -> float:
+        """Seconds until ``amount`` tokens are available above ``reserve`` (0 if now)"""
+        self._refill(time.monotonic() if now is None else now)
+        missing = amount + reserve - self.tokens
+        if missing <= 0:
+            return 0.0
+        if amount + reserve > self.capacity:
+            # The reserve can never be left intact; take from a full bucket instead
+            missing = self.capacity - self.tokens
+        return missing / self.rate if self.rate > 0 else float("inf")
+
+    def take(self, amount: float):
+        self.tokens -= amount
+
+
+class Budget:
+    """Estimated token and credit spend over a rolling window"""
+
+    def __init__(self, tokens: Optional[int] = None, credits: Optional[float] = None, window_s: float = 3600.0):
+        self.token_limit = tokens
+        self.credit_limit = credits
+        self.window_s = window_s
+        self._entries: "deque[Tuple[float, int, float]]" = deque()
+        self._tokens = 0
+        self._credits = 0.0
+
+    def _prune(self, now: float):
+        cutoff = now - self.window_s
+        while self._entries and self._entries[0][0] < cutoff:
+            _, tokens, credits = self._entries.popleft()
+            self._tokens -= tokens
+            self._credits -= credits
+
+    def spent(self, now: Optional[float] = None) -> Tuple[int, float]:
+        self._prune(time.monotonic() if now is None else now)
+        return self._tokens, self._credits
+
+    def check(self, tokens: int, credits: float, reserve: float = 0.0) -> Optional[str]:
+        """Return why a charge would exceed the budget, or None if it fits
+
+        ``reserve`` is the fraction of each limit the charge may not dip into.
+        """
+        spent_tokens, spent_credits = self.spent()
+        share = 1.0 - reserve
+        if self.token_limit is not None and spent_tokens + tokens > self.token_limit * share:
+            return (f"token budget exhausted ({spent_tokens:,} of {int(self.token_limit * share):,} "
+                    f"per {self.window_s:.0f}s)")
+        if self.credit_limit is not None and spent_credits + credits > self.credit_limit * share:
+            return (f"credit budget exhausted ({spent_credits:.3f} of {self.credit_limit * share:g} "
+                    f"per {self.window_s:.0f}s)")
+        return None
+
+    def charge(self, tokens: int, credits: float):
+        self._entries.append((time.monotonic(), tokens, credits))
+        self._tokens += tokens
+        self._credits += credits
+
+
+class Ticket:
+    """An admitted call; ``settle`` corrects the budget with actual usage"""
+
+    def __init__(self, controller: "AdmissionController", model: Optional[str], tokens: int, credits: float):
+        self._controller = controller
+        self.model = model
+        self.tokens = tokens
+        self.credits = credits
+        self.waited_s = 0.0
+
+    def settle(self, actual_tokens: int):
+        extra = actual_tokens - self.tokens
+        if extra:
+            self._controller._charge(extra, estimate_credits(self.model, extra) if self.model else 0.0)
+            self.tokens = actual_tokens
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "keys")
+
+    def __init__(self, priority: int, seq: int, keys: List[str]):
+        self.priority = priority
+        self.seq = seq
+        self.keys = keys
+
+
+class AdmissionController:
+    """Admit Cortex and warehouse calls by priority under per-resource rate limits
+
+    ``model_limits`` and ``warehouse_limits`` map a model or warehouse name to
+    ``(requests_per_second, burst)``; resources without a limit are not rate
+    limited. Waiting calls are served strictly by priority, then arrival,
+    among calls that share a bucket. Background calls must leave
+    ``interactive_reserve`` of each bucket's burst, and of the token and
+    credit budgets, untouched.
+
+    Load is shed with ``AdmissionRejected`` when a priority's queue already
+    holds ``max_queued`` calls, when a call would wait longer than
+    ``max_wait_s`` for its priority, or when its estimated tokens/credits
+    would exceed the rolling budget.
+    """
+
+    def __init__(self, model_limits: Optional[Dict[str, Tuple[float, float]]] = None,
+                 warehouse_limits: Optional[Dict[str, Tuple[float, float]]] = None,
+                 max_queued: Optional[Dict[int, int]] = None,
+                 max_wait_s: Optional[Dict[int, float]] = None,
+                 interactive_reserve: float = 0.25,
+                 token_budget: Optional[int] = None, credit_budget: Optional[float] = None,
+                 budget_window_s: float = 3600.0):
+        self._buckets: Dict[str, TokenBucket] = {}
+        for name, (rate, burst) in (model_limits or {}).items():
+            self._buckets[f"model:{name}"] = TokenBucket(rate, burst)
+        for name, (rate, burst) in (warehouse_limits or {}).items():
+            self._buckets[f"warehouse:{name.upper()}"] = TokenBucket(rate, burst)
+        self.max_queued = {INTERACTIVE: 32, BACKGROUND: 256, **(max_queued or {})}
+        self.max_wait_s = {INTERACTIVE: 10.0, BACKGROUND: 300.0, **(max_wait_s or {})}
+        self.interactive_reserve = interactive_reserve
+        self.budget = Budget(token_budget, credit_budget, budget_window_s)
+        self._cond = threading.Condition()
+        self._waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+        self.stats: Dict[str, int] = {"admitted": 0, "rejected_queue": 0, "rejected_timeout": 0,
+                                      "rejected_budget": 0}
+
+    def _charge(self, tokens: int, credits: float):
+        with self._cond:
+            self.budget.charge(tokens, credits)
+
+    def _blocked_by_earlier(self, waiter: _Waiter) -> bool:
+        return any(
+            (other.priority, other.seq) < (waiter.priority, waiter.seq) and set(other.keys) & set(waiter.keys)
+            for other in self._waiters
+        )
+
+    def _reject(self, reason: str, stat: str, resource: str, level: int):
+        self.stats[stat] += 1
+        raise AdmissionRejected(reason, resource, level)
+
+    def admit(self, model: Optional[str] = None, warehouse: Optional[str] = None,
+              tokens: int = 0, credits: float = 0.0, level: Optional[int] = None) -> Ticket:
+        """Block until the call may start; raise ``AdmissionRejected`` to shed it
+
+        ``tokens`` is the estimated Cortex token count; model calls are also
+        charged the matching estimated credits.
+        """
+        level = current_priority() if level is None else level
+        keys = [k for k in (f"model:{model}" if model else None,
+                            f"warehouse:{warehouse.upper()}" if warehouse else None) if k in self._buckets]
+        resource = model or warehouse or "snowflake"
+        if model:
+            credits += estimate_credits(model, tokens)
+
+        reserve_fraction = self.interactive_reserve if level != INTERACTIVE else 0.0
+        with span("admission.wait", resource=resource, priority=PRIORITY_NAMES.get(level, level)) as s, self._cond:
+            reason = self.budget.check(tokens, credits, reserve_fraction)
+            if reason:
+                self._reject(reason, "rejected_budget", resource, level)
+            if sum(1 for w in self._waiters if w.priority == level) >= self.max_queued[level]:
+                self._reject(f"queue full ({self.max_queued[level]} waiting)", "rejected_queue", resource, level)
+
+            waiter = _Waiter(level, next(self._seq), keys)
+            self._waiters.append(waiter)
+            start = time.monotonic()
+            deadline = start + self.max_wait_s[level]
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = 0.0
+                    if self._blocked_by_earlier(waiter):
+                        wait = None
+                    else:
+                        for key in keys:
+                            bucket = self._buckets[key]
+                            wait = max(wait, bucket.wait_time(1, reserve_fraction * bucket.capacity, now))
+                    if wait == 0.0:
+                        break
+                    if wait is not None and now + wait > deadline or now >= deadline:
+                        self._reject(f"would wait more than {self.max_wait_s[level]:g}s",
+                                     "rejected_timeout", resource, level)
+                    self._cond.wait(timeout=deadline - now if wait is None else wait)
+                for key in keys:
+                    self._buckets[key].take(1)
+                self.budget.charge(tokens, credits)
+                self.stats["admitted"] += 1
+            finally:
+                self._waiters.remove(waiter)
+                self._cond.notify_all()
+
+            ticket = Ticket(self, model, tokens, credits)
+            ticket.waited_s = time.monotonic() - start
+            s.set(waited_ms=round(ticket.waited_s * 1000, 3), queued=len(self._waiters))
+        return ticket
+
+    def snapshot(self) -> Dict:
+        """Bucket levels, queue lengths, budget spend and admission counters"""
+        with self._cond:
+            now = time.monotonic()
+            for bucket in self._buckets.values():
+                bucket.wait_time(0, 0, now)
+            spent_tokens, spent_credits = self.budget.spent(now)
+            return {
+                "buckets": {key: round(bucket.tokens, 2) for key, bucket in self._buckets.items()},
+                "queued": {PRIORITY_NAMES[p]: sum(1 for w in self._waiters if w.priority == p)
+                           for p in (INTERACTIVE, BACKGROUND)},
+                "spent_tokens": spent_tokens,
+                "spent_credits": round(spent_credits, 6),
+                **self.stats,
+            }
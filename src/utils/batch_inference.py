@@ -0,0 +1,203 @@
+import json
+import re
+import string
+from typing import Dict, List, Optional
+
+from src.utils.admission import CHARS_PER_TOKEN, OUTPUT_TOKEN_ESTIMATE, background
+from src.utils.instrumentation import span
+from src.utils.sql import sql_literal
+
+
+def template_to_sql(template: str) -> str:
+    """Translate a ``str.format`` style template into a SQL string expression
+
+    ``"Summarize {SOP_TITLE}: {SOP_CONTENT}"`` becomes
+    ``'Summarize ' || COALESCE(TO_VARCHAR(SOP_TITLE), '') || ': ' || ...``.
+    Field names must be plain column identifiers.
+    """
+    parts = []
+    for literal, field, format_spec, conversion in string.Formatter().parse(template):
+        if literal:
+            parts.append(sql_literal(literal))
+        if field is None:
+            continue
+        if format_spec or conversion or not re.fullmatch(r"[A-Za-z_][A-Za-z0-9_$]*", field):
+            raise ValueError(f"Unsupported template field: {{{field}}}")
+        parts.append(f"COALESCE(TO_VARCHAR({field}), '')")
+    return " || ".join(parts) if parts else "''"
+
+
+class BatchInferenceJob:
+    """Run ``SNOWFLAKE.CORTEX.COMPLETE`` set-based over a table, in resumable chunks
+
+    Every source row gets a prompt built from ``prompt_template`` (over its
+    columns) and an input hash of prompt + model + options. Results are merged
+    into ``target_table`` keyed on ``key_column``; a row is pending when it has
+    no result yet, its input hash changed, or it failed fewer than
+    ``max_attempts`` times. Reruns therefore skip unchanged rows and pick up
+    where an interrupted run stopped.
+
+    Each chunk is one ``MERGE`` evaluated inside the warehouse, so N rows cost
+    ``ceil(N / chunk_size)`` round trips instead of N ``complete`` calls.
+    """
+
+    def __init__(self, sf_helper, source: str, prompt_template: str, target_table: str,
+                 key_column: str, model: str = "mistral-7b", chunk_size: int = 500,
+                 max_attempts: int = 3, options: Optional[Dict] = None):
+        self.sf_helper = sf_helper
+        self.source = source
+        self.prompt_template = prompt_template
+        self.target_table = target_table
+        self.key_column = key_column
+        self.model = model
+        self.chunk_size = chunk_size
+        self.max_attempts = max_attempts
+        self.options = options
+
+    @property
+    def source_sql(self) -> str:
+        """The source as a FROM-able relation (table name or parenthesized query)"""
+        if re.match(r"^\s*(SELECT|WITH)\b", self.source, re.IGNORECASE):
+            return f"({self.source})"
+        return self.source
+
+    def create_target_table(self):
+        self.sf_helper.execute_query(f"""
+        CREATE TABLE IF NOT EXISTS {self.target_table} (
+            ROW_KEY VARCHAR,
+            INPUT_HASH VARCHAR,
+            MODEL VARCHAR,
+            RESPONSE VARCHAR,
+            STATUS VARCHAR,
+            ATTEMPTS INTEGER,
+            UPDATED_AT TIMESTAMP_NTZ
+        )
+        """)
+
+    def _response_sql(self) -> str:
+        if not self.options:
+            return f"SNOWFLAKE.CORTEX.TRY_COMPLETE({sql_literal(self.model)}, PROMPT)"
+        # With options COMPLETE takes a message list and returns a JSON object
+        options = sql_literal(json.dumps(self.options))
+        return (
+            f"SNOWFLAKE.CORTEX.TRY_COMPLETE({sql_literal(self.model)}, "
+            f"[{{'role': 'user', 'content': PROMPT}}], PARSE_JSON({options}))"
+            f":choices[0]:messages::VARCHAR"
+        )
+
+    def pending_sql(self, limit: Optional[int] = None) -> str:
+        """SELECT of rows that still need inference (``ROW_KEY, PROMPT, INPUT_HASH, IS_RETRY``)
+
+        ``IS_RETRY`` is 1 for rows retried after a failure with unchanged input.
+        """
+        fingerprint = sql_literal(f"|{self.model}|{json.dumps(self.options or {}, sort_keys=True)}")
+        limit_clause = f"LIMIT {limit}" if limit else ""
+        return f"""
+        WITH src AS (
+            SELECT TO_VARCHAR({self.key_column}) as ROW_KEY,
+                   {template_to_sql(self.prompt_template)} as PROMPT
+            FROM {self.source_sql}
+        ),
+        hashed AS (
+            SELECT ROW_KEY, PROMPT, SHA2(PROMPT || {fingerprint}, 256) as INPUT_HASH
+            FROM src
+        )
+        SELECT h.ROW_KEY, h.PROMPT, h.INPUT_HASH,
+               IFF(t.STATUS = 'FAILED' AND t.INPUT_HASH = h.INPUT_HASH, 1, 0) as IS_RETRY
+        FROM hashed h
+        LEFT JOIN {self.target_table} t ON t.ROW_KEY = h.ROW_KEY
+        WHERE t.ROW_KEY IS NULL
+           OR t.INPUT_HASH <> h.INPUT_HASH
+           OR (t.STATUS = 'FAILED' AND t.ATTEMPTS < {self.max_attempts})
+        ORDER BY h.ROW_KEY
+        {limit_clause}
+        """
+
+    def merge_chunk_sql(self) -> str:
+        """MERGE that runs inference on the next chunk of pending rows"""
+        return f"""
+        MERGE INTO {self.target_table} t
+        USING (
+            SELECT ROW_KEY, INPUT_HASH, {self._response_sql()} as RESPONSE
+            FROM ({self.pending_sql(self.chunk_size)})
+        ) s
+        ON t.ROW_KEY = s.ROW_KEY
+        WHEN MATCHED THEN UPDATE SET
+            ATTEMPTS = IFF(t.INPUT_HASH = s.INPUT_HASH, t.ATTEMPTS + 1, 1),
+            INPUT_HASH = s.INPUT_HASH,
+            MODEL = {sql_literal(self.model)},
+            RESPONSE = s.RESPONSE,
+            STATUS = IFF(s.RESPONSE IS NULL, 'FAILED', 'OK'),
+            UPDATED_AT = CURRENT_TIMESTAMP()
+        WHEN NOT MATCHED THEN INSERT (ROW_KEY, INPUT_HASH, MODEL, RESPONSE, STATUS, ATTEMPTS, UPDATED_AT)
+        VALUES (s.ROW_KEY, s.INPUT_HASH, {sql_literal(self.model)}, s.RESPONSE,
+                IFF(s.RESPONSE IS NULL, 'FAILED', 'OK'), 1, CURRENT_TIMESTAMP())
+        """
+
+    def chunk_estimate(self) -> Dict[str, int]:
+        """Rows, retried rows and estimated Cortex tokens of the next chunk (prompt chars / 4 + output per row)"""
+        result = self.sf_helper.execute_query(
+            f"SELECT COUNT(*) as N, COALESCE(SUM(LENGTH(PROMPT)), 0) as CHARS, "
+            f"COALESCE(SUM(IS_RETRY), 0) as RETRIES "
+            f"FROM ({self.pending_sql(self.chunk_size)})"
+        )
+        rows, chars = int(result["N"].iloc[0]), int(result["CHARS"].iloc[0])
+        return {"rows": rows, "retries": int(result["RETRIES"].iloc[0]),
+                "tokens": chars // CHARS_PER_TOKEN + rows * (1 + OUTPUT_TOKEN_ESTIMATE)}
+
+    def pending_count(self) -> int:
+        result = self.sf_helper.execute_query(f"SELECT COUNT(*) as PENDING FROM ({self.pending_sql()})")
+        return int(result["PENDING"].iloc[0])
+
+    def status(self) -> Dict[str, int]:
+        """Row counts per status in the target table, plus pending rows"""
+        result = self.sf_helper.execute_query(
+            f"SELECT STATUS, COUNT(*) as N FROM {self.target_table} GROUP BY STATUS"
+        )
+        counts = {row["STATUS"]: int(row["N"]) for row in result.to_dict("records")}
+        counts["PENDING"] = self.pending_count()
+        return counts
+
+    def failures(self, limit: int = 20):
+        """Rows whose inference failed (``TRY_COMPLETE`` returned NULL)"""
+        return self.sf_helper.execute_query(f"""
+        SELECT ROW_KEY, ATTEMPTS, UPDATED_AT
+        FROM {self.target_table}
+        WHERE STATUS = 'FAILED'
+        ORDER BY UPDATED_AT DESC
+        LIMIT {limit}
+        """)
+
+    def run(self, max_chunks: Optional[int] = None) -> Dict[str, int]:
+        """Process pending rows chunk by chunk; safe to interrupt and rerun"""
+        self.create_target_table()
+        total = self.pending_count()
+        print(f"Batch inference into {self.target_table}: {total} pending rows "
+              f"({self.chunk_size} per chunk, model {self.model})")
+
+        processed = chunks = 0
+        # Batch chunks queue behind interactive queries when admission control is on
+        with background(), span("batch_inference.run", target=self.target_table, model=self.model,
+                                pending=total) as s:
+            while max_chunks is None or chunks < max_chunks:
+                estimate = self.chunk_estimate()
+                if estimate["rows"] == 0:
+                    break
+                # Admitted against the model's rate limit and the token/credit budget
+                with span("batch_inference.chunk", chunk=chunks, estimated_tokens=estimate["tokens"]) as c:
+                    c.incr("retries", estimate["retries"])
+                    result = self.sf_helper.execute_query(self.merge_chunk_sql(), model=self.model,
+                                                          tokens=estimate["tokens"])
+                rows: List[int] = [int(v) for v in result.iloc[0].tolist()] if not result.empty else []
+                merged = sum(rows)
+                if merged == 0:
+                    break
+                processed += merged
+                chunks += 1
+                print(f"  chunk {chunks}: {merged} rows ({min(processed, total)}/{total})")
+            s.set(processed=processed, chunks=chunks)
+
+        counts = self.status()
+        print(f"✓ Batch inference done: {counts.get('OK', 0)} ok, {counts.get('FAILED', 0)} failed, "
+              f"{counts['PENDING']} pending")
+        return counts
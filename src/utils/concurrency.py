@@ -0,0 +1,23 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+
+def map_concurrently(func: Callable, items: list, max_workers: int = 4) -> list:
+    """Apply ``func`` to ``items`` with bounded parallelism, preserving order
+
+    Each result is either the return value or the raised exception, so one
+    failing item does not discard the others.
+    """
+    def call(item):
+        try:
+            return func(item)
+        except Exception as e:
+            return e
+
+    if max_workers <= 1 or len(items) <= 1:
+        return [call(item) for item in items]
+    # Copy the caller's context so tracing spans in workers nest under the current span
+    contexts = [contextvars.copy_context() for _ in items]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as pool:
+        return list(pool.map(lambda ctx, item: ctx.run(call, item), contexts, items))
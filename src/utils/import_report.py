@@ -0,0 +1,92 @@
+"""Startup-time report built on ``python -X importtime``.
+
+Usage (from the repository root)::
+
+    python -m src.utils.import_report                       # default app modules
+    python -m src.utils.import_report src.utils.snowflake_helper --top 15
+    python -m src.utils.import_report --json > import_times.json
+
+Each module is imported in a fresh interpreter so results reflect a cold start.
+"""
+import argparse
+import json
+import subprocess
+import sys
+from typing import Dict, List
+
+DEFAULT_MODULES = [
+    "src.config",
+    "src.utils.snowflake_helper",
+    "src.agents.staff_admin",
+    "src.data.enhanced_dummy_data_generator",
+]
+
+
+def measure_import(module: str) -> Dict:
+    """Import ``module`` in a fresh interpreter and parse the importtime log"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True,
+    )
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        entries.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+        })
+
+    target = next((e for e in reversed(entries) if e["module"] == module), None)
+    return {
+        "module": module,
+        "ok": proc.returncode == 0,
+        "error": proc.stderr.strip().splitlines()[-1] if proc.returncode else None,
+        "total_us": target["cumulative_us"] if target else None,
+        "imports": entries,
+    }
+
+
+def top_level_packages(report: Dict) -> List[Dict]:
+    """Sum self time per top-level package (``pandas``, ``snowflake``, ...)"""
+    totals: Dict[str, int] = {}
+    for entry in report["imports"]:
+        package = entry["module"].split(".")[0]
+        totals[package] = totals.get(package, 0) + entry["self_us"]
+    return [{"package": p, "self_us": us} for p, us in sorted(totals.items(), key=lambda kv: -kv[1])]
+
+
+def print_report(report: Dict, top: int = 10):
+    if not report["ok"]:
+        print(f"✗ {report['module']}: {report['error']}")
+        return
+    print(f"\n{report['module']}: {report['total_us'] / 1000:.1f} ms cumulative")
+    print(f"  {'package':<32} {'self ms':>9}")
+    for row in top_level_packages(report)[:top]:
+        print(f"  {row['package']:<32} {row['self_us'] / 1000:>9.1f}")
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m src.utils.import_report",
+                                     description="Report cold-start import time per module")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES, help="Modules to import")
+    parser.add_argument("--top", type=int, default=10, help="Packages to list per module")
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    args = parser.parse_args(argv)
+
+    reports = [measure_import(module) for module in args.modules]
+    if args.json:
+        for report in reports:
+            report["packages"] = top_level_packages(report)
+        print(json.dumps(reports, indent=2))
+    else:
+        for report in reports:
+            print_report(report, top=args.top)
+    return 0 if all(r["ok"] for r in reports) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,333 @@
+"""Lightweight tracing for Snowflake calls and agent turns.
+
+Usage::
+
+    from src.utils.instrumentation import configure, HistogramExporter, JsonLogExporter
+
+    histogram = HistogramExporter()
+    configure([histogram, JsonLogExporter()])
+    ...  # run queries / agent turns
+    histogram.print_summary()
+
+Tracing is disabled until ``configure`` is called with at least one exporter
+(or ``configure_from_env`` finds ``AURA_TRACE_EXPORTERS``). While disabled,
+``span()`` returns a shared no-op object, so instrumented code pays for one
+function call and nothing else.
+"""
+import bisect
+import contextvars
+import itertools
+import json
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, TextIO
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("aura_current_span", default=None)
+_span_ids = itertools.count(1)
+
+
+class Span:
+    """A timed unit of work with attributes and counters"""
+
+    recording = True
+
+    def __init__(self, tracer: "Tracer", name: str, attributes: Dict):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.counters: Dict[str, int] = {}
+        self.span_id = next(_span_ids)
+        self.parent: Optional[Span] = None
+        self.trace_id = self.span_id
+        self.start_time_ns = 0
+        self.end_time_ns = 0
+        self.status = "ok"
+        self.error: Optional[str] = None
+        self._token = None
+
+    @property
+    def duration_s(self) -> float:
+        return (self.end_time_ns - self.start_time_ns) / 1e9
+
+    def set(self, **attributes):
+        """Set or overwrite attributes (row counts, query ID, cache result, ...)"""
+        self.attributes.update(attributes)
+
+    def incr(self, counter: str, amount: int = 1):
+        """Increment a counter such as ``retries``"""
+        self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def __enter__(self) -> "Span":
+        self.parent = _current_span.get()
+        if self.parent is not None:
+            self.trace_id = self.parent.trace_id
+        self._token = _current_span.set(self)
+        self.start_time_ns = time.time_ns()
+        self._start = time.perf_counter_ns()
+        for exporter in self.tracer.exporters:
+            exporter.on_start(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_time_ns = self.start_time_ns + (time.perf_counter_ns() - self._start)
+        if exc_type is not None:
+            self.status = "error"
+            self.error = f"{exc_type.__name__}: {exc}"
+        _current_span.reset(self._token)
+        for exporter in self.tracer.exporters:
+            exporter.export(self)
+        return False
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent else None,
+            "start_time_ns": self.start_time_ns,
+            "duration_ms": round(self.duration_s * 1000, 3),
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+            "counters": self.counters,
+        }
+
+
+class _NoopSpan:
+    """Returned while tracing is disabled; every operation is a no-op"""
+
+    recording = False
+
+    def set(self, **attributes):
+        pass
+
+    def incr(self, counter: str, amount: int = 1):
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class SpanExporter:
+    """Base class for exporters. ``export`` is called when a span ends."""
+
+    def on_start(self, span: Span):
+        pass
+
+    def export(self, span: Span):
+        raise NotImplementedError
+
+
+class JsonLogExporter(SpanExporter):
+    """Write one JSON object per finished span to a text stream"""
+
+    def __init__(self, stream: Optional[TextIO] = None):
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            (self.stream or sys.stderr).write(line + "\n")
+
+
+class HistogramExporter(SpanExporter):
+    """Aggregate span durations per name into fixed latency buckets"""
+
+    BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, 60000]
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict] = {}
+
+    def export(self, span: Span):
+        duration_ms = span.duration_s * 1000
+        with self._lock:
+            stats = self._stats.get(span.name)
+            if stats is None:
+                stats = self._stats[span.name] = {
+                    "count": 0, "errors": 0, "sum_ms": 0.0, "min_ms": duration_ms, "max_ms": duration_ms,
+                    "buckets": [0] * (len(self.BUCKETS_MS) + 1), "counters": {},
+                }
+            stats["count"] += 1
+            stats["sum_ms"] += duration_ms
+            stats["min_ms"] = min(stats["min_ms"], duration_ms)
+            stats["max_ms"] = max(stats["max_ms"], duration_ms)
+            stats["buckets"][bisect.bisect_left(self.BUCKETS_MS, duration_ms)] += 1
+            if span.status != "ok":
+                stats["errors"] += 1
+            for key, value in span.counters.items():
+                stats["counters"][key] = stats["counters"].get(key, 0) + value
+            cache = span.attributes.get("cache")
+            if cache in ("hit", "miss"):
+                stats["counters"][f"cache_{cache}"] = stats["counters"].get(f"cache_{cache}", 0) + 1
+
+    def _percentile(self, stats: Dict, q: float) -> float:
+        """Upper bound of the bucket containing the q-th percentile"""
+        target = q * stats["count"]
+        seen = 0
+        for i, n in enumerate(stats["buckets"]):
+            seen += n
+            if seen >= target and n:
+                return float(self.BUCKETS_MS[i]) if i < len(self.BUCKETS_MS) else stats["max_ms"]
+        return stats["max_ms"]
+
+    def summary(self) -> Dict[str, Dict]:
+        """Return count, mean and approximate percentiles per span name"""
+        with self._lock:
+            return {
+                name: {
+                    "count": s["count"],
+                    "errors": s["errors"],
+                    "total_ms": round(s["sum_ms"], 3),
+                    "mean_ms": round(s["sum_ms"] / s["count"], 3),
+                    "min_ms": round(s["min_ms"], 3),
+                    "max_ms": round(s["max_ms"], 3),
+                    "p50_ms": self._percentile(s, 0.50),
+                    "p95_ms": self._percentile(s, 0.95),
+                    "p99_ms": self._percentile(s, 0.99),
+                    "counters": dict(s["counters"]),
+                }
+                for name, s in self._stats.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def print_summary(self):
+        """Print a table of span timings, slowest total first"""
+        rows = sorted(self.summary().items(), key=lambda kv: kv[1]["total_ms"], reverse=True)
+        print(f"{'span':<36} {'count':>6} {'mean ms':>10} {'p50 ms':>9} {'p95 ms':>9} {'total ms':>11}")
+        for name, s in rows:
+            print(f"{name:<36} {s['count']:>6} {s['mean_ms']:>10.2f} {s['p50_ms']:>9.0f} "
+                  f"{s['p95_ms']:>9.0f} {s['total_ms']:>11.2f}")
+
+
+class OpenTelemetryExporter(SpanExporter):
+    """Mirror spans into OpenTelemetry (requires ``opentelemetry-api``/``-sdk``)"""
+
+    def __init__(self, tracer_name: str = "aura"):
+        try:
+            from opentelemetry import trace
+        except ImportError as e:
+            raise ImportError(
+                "OpenTelemetryExporter requires the 'opentelemetry-api' package"
+            ) from e
+        self._trace = trace
+        self._otel_tracer = trace.get_tracer(tracer_name)
+        self._open: Dict[int, object] = {}
+        self._lock = threading.Lock()
+
+    def on_start(self, span: Span):
+        context = None
+        if span.parent is not None:
+            with self._lock:
+                parent = self._open.get(span.parent.span_id)
+            if parent is not None:
+                context = self._trace.set_span_in_context(parent)
+        otel_span = self._otel_tracer.start_span(span.name, context=context, start_time=span.start_time_ns)
+        with self._lock:
+            self._open[span.span_id] = otel_span
+
+    def export(self, span: Span):
+        with self._lock:
+            otel_span = self._open.pop(span.span_id, None)
+        if otel_span is None:
+            return
+        for key, value in span.attributes.items():
+            if value is not None:
+                otel_span.set_attribute(key, value if isinstance(value, (str, bool, int, float)) else str(value))
+        for key, value in span.counters.items():
+            otel_span.set_attribute(key, value)
+        if span.status != "ok":
+            otel_span.set_status(self._trace.Status(self._trace.StatusCode.ERROR, span.error))
+        otel_span.end(end_time=span.end_time_ns)
+
+
+class Tracer:
+    """Creates spans and fans finished spans out to exporters"""
+
+    def __init__(self, exporters: Optional[List[SpanExporter]] = None):
+        self.exporters: List[SpanExporter] = list(exporters or [])
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.exporters)
+
+    def span(self, name: str, **attributes):
+        if not self.exporters:
+            return NOOP_SPAN
+        return Span(self, name, attributes)
+
+
+_tracer = Tracer()
+
+EXPORTER_FACTORIES = {
+    "json": JsonLogExporter,
+    "histogram": HistogramExporter,
+    "otel": OpenTelemetryExporter,
+}
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+def span(name: str, **attributes):
+    """Start a span on the global tracer (use as a context manager)"""
+    if not _tracer.exporters:
+        return NOOP_SPAN
+    return Span(_tracer, name, attributes)
+
+
+def record(name: str, start_time_ns: int, end_time_ns: int, status: str = "ok",
+           counters: Optional[Dict[str, int]] = None, **attributes):
+    """Export an already-finished span, e.g. one timed across generator yields
+
+    The span is parented to the current span but never becomes current itself.
+    """
+    if not _tracer.exporters:
+        return
+    finished = Span(_tracer, name, attributes)
+    finished.parent = _current_span.get()
+    if finished.parent is not None:
+        finished.trace_id = finished.parent.trace_id
+    finished.start_time_ns = start_time_ns
+    finished.end_time_ns = end_time_ns
+    finished.status = status
+    finished.counters.update(counters or {})
+    for exporter in _tracer.exporters:
+        exporter.on_start(finished)
+        exporter.export(finished)
+
+
+def current_span():
+    """Return the innermost active span, or the no-op span"""
+    return _current_span.get() or NOOP_SPAN
+
+
+def configure(exporters: Optional[List[SpanExporter]] = None) -> Tracer:
+    """Replace the global exporters; an empty list disables tracing"""
+    _tracer.exporters = list(exporters or [])
+    return _tracer
+
+
+def configure_from_env() -> Tracer:
+    """Configure exporters from ``AURA_TRACE_EXPORTERS`` (e.g. ``json,histogram``)"""
+    from src.config import SnowflakeConfig
+
+    names = SnowflakeConfig.get_trace_exporters()
+    return configure([EXPORTER_FACTORIES[name]() for name in names])
+
+
+def find_exporter(exporter_type: type) -> Optional[SpanExporter]:
+    """Return the first configured exporter of ``exporter_type``"""
+    return next((e for e in _tracer.exporters if isinstance(e, exporter_type)), None)
@@ -0,0 +1,126 @@
+"""In-memory result caches that know whether an entry was pre-warmed.
+
+Entries stored while ``warming()`` is active (see ``src.agents.cache_warmer``)
+are marked warm. Live lookups are counted as warm hits, cold hits (entry
+stored by earlier live traffic) or misses, so the value of warming can be
+read off ``hit_ratios()``. Lookups made while warming are not counted.
+"""
+import contextlib
+import contextvars
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from src.utils.instrumentation import span
+
+_warming: contextvars.ContextVar = contextvars.ContextVar("aura_cache_warming", default=False)
+
+
+@contextlib.contextmanager
+def warming():
+    """Mark cache reads and writes in the enclosed block as cache warming"""
+    token = _warming.set(True)
+    try:
+        yield
+    finally:
+        _warming.reset(token)
+
+
+def is_warming() -> bool:
+    return _warming.get()
+
+
+def tool_cache_key(tool_name: str, kwargs: dict) -> Tuple[str, str]:
+    return tool_name, json.dumps(kwargs, sort_keys=True, default=str)
+
+
+def completion_cache_key(model: str, prompt: str) -> Tuple[str, str]:
+    return model, hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+class QueryCache:
+    """Thread-safe LRU cache with optional TTL and warm/cold hit accounting
+
+    While warming, entries past half their TTL count as misses so the
+    warmer refreshes them before live traffic sees them expire.
+    """
+
+    def __init__(self, name: str, max_entries: int = 512, ttl_s: Optional[float] = None):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        # key -> (value, stored_at, stored_by_warmer)
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float, bool]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"warm_hits": 0, "cold_hits": 0, "misses": 0, "warm_fills": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, key: Hashable) -> Tuple[bool, Any]:
+        """Return ``(found, value)``; recorded as a ``cache.<name>`` span tagged ``cache=hit|miss``"""
+        with span(f"cache.{self.name}", warming=is_warming()) as s:
+            found, value = self._lookup(key)
+            s.set(cache="hit" if found else "miss")
+        return found, value
+
+    def _lookup(self, key: Hashable) -> Tuple[bool, Any]:
+        warm_lookup = is_warming()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = time.monotonic() - entry[1]
+                if self.ttl_s is not None and age > (self.ttl_s / 2 if warm_lookup else self.ttl_s):
+                    if age > self.ttl_s:
+                        del self._entries[key]
+                    entry = None
+            if not warm_lookup:
+                if entry is None:
+                    self.stats["misses"] += 1
+                else:
+                    self.stats["warm_hits" if entry[2] else "cold_hits"] += 1
+            if entry is None:
+                return False, None
+            self._entries.move_to_end(key)
+            return True, entry[0]
+
+    def put(self, key: Hashable, value: Any):
+        warm = is_warming()
+        with self._lock:
+            self._entries[key] = (value, time.monotonic(), warm)
+            self._entries.move_to_end(key)
+            if warm:
+                self.stats["warm_fills"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        found, value = self.lookup(key)
+        if found:
+            return value
+        value = compute()
+        self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def hit_ratios(self) -> Dict[str, float]:
+        """Share of live lookups answered by warmed entries, by live-filled entries, and in total"""
+        with self._lock:
+            stats = dict(self.stats)
+            entries = len(self._entries)
+        lookups = stats["warm_hits"] + stats["cold_hits"] + stats["misses"]
+        ratio = (lambda n: round(n / lookups, 4) if lookups else 0.0)
+        return {
+            "entries": entries,
+            "lookups": lookups,
+            "warm_hit_ratio": ratio(stats["warm_hits"]),
+            "cold_hit_ratio": ratio(stats["cold_hits"]),
+            "hit_ratio": ratio(stats["warm_hits"] + stats["cold_hits"]),
+            **stats,
+        }
@@ -0,0 +1,157 @@
+"""Prepare agent tables and charts for display without rendering them in full.
+
+Streamlit re-runs the whole script on every interaction, so anything done
+per message is paid again for the entire history. The helpers here turn an
+agent ``result_set`` into a DataFrame once, page it, and shrink inline
+Vega-Lite data to a point budget; ``RenderCache`` keeps the results keyed
+by (message index, content index) so reruns reuse them.
+"""
+import copy
+import json
+import math
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DEFAULT_PAGE_SIZE = 200
+DEFAULT_POINT_BUDGET = 2000
+
+
+def result_set_frame(rs: dict) -> "pd.DataFrame":
+    """Build a DataFrame from an agent result_set (2D ``data`` + ``row_type`` names)"""
+    import numpy as np
+    import pandas as pd
+
+    columns = [c["name"] for c in rs["result_set_meta_data"]["row_type"]]
+    return pd.DataFrame(np.array(rs["data"]), columns=columns)
+
+
+def page_count(total_rows: int, page_size: int = DEFAULT_PAGE_SIZE) -> int:
+    return max(1, math.ceil(total_rows / page_size))
+
+
+def page_bounds(page: int, total_rows: int, page_size: int = DEFAULT_PAGE_SIZE) -> Tuple[int, int]:
+    """Row range ``[start, end)`` of 1-based ``page``, clamped to the data"""
+    page = min(max(page, 1), page_count(total_rows, page_size))
+    start = (page - 1) * page_size
+    return start, min(start + page_size, total_rows)
+
+
+def _as_number(value) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _min_max_buckets(rows: List[dict], max_points: int, y: str) -> List[dict]:
+    """Keep the min and max ``y`` row of each bucket of consecutive rows (keeps peaks)"""
+    ys = [_as_number(row.get(y)) for row in rows]
+    buckets = max(1, max_points // 2)
+    size = len(rows) / buckets
+    kept = []
+    for b in range(buckets):
+        start, end = int(b * size), min(int((b + 1) * size), len(rows))
+        valid = [i for i in range(start, end) if ys[i] is not None]
+        if not valid:
+            if start < end:
+                kept.append(start)
+            continue
+        lo = min(valid, key=ys.__getitem__)
+        hi = max(valid, key=ys.__getitem__)
+        kept.extend(sorted({lo, hi}))
+    return [rows[i] for i in kept]
+
+
+def downsample_rows(rows: List[dict], max_points: int, x: Optional[str] = None,
+                    y: Optional[str] = None, series: Optional[str] = None) -> List[dict]:
+    """Reduce ``rows`` to about ``max_points`` while keeping the chart's shape
+
+    With a numeric ``y`` each series is ordered by ``x`` and reduced with
+    min/max buckets; otherwise (or with more than ``max_points / 2``
+    series) rows are sampled at an even stride. The result never exceeds
+    ``max_points``.
+    """
+    if len(rows) <= max_points:
+        return rows
+    if series:
+        groups: Dict[Any, List[dict]] = {}
+        for row in rows:
+            groups.setdefault(row.get(series), []).append(row)
+        if len(groups) > 1 and len(groups) * 2 <= max_points:
+            budget = max_points // len(groups)
+            return [r for group in groups.values() for r in downsample_rows(group, budget, x, y)]
+        if len(groups) > 1:
+            # Too many series for two points each; sample across all of them instead
+            step = len(rows) / max_points
+            return [rows[int(i * step)] for i in range(max_points)]
+    if y and _as_number(rows[0].get(y)) is not None:
+        if x:
+            try:
+                rows = sorted(rows, key=lambda r: r.get(x))
+            except TypeError:
+                pass
+        return _min_max_buckets(rows, max_points, y)
+    step = len(rows) / max_points
+    return [rows[int(i * step)] for i in range(max_points)]
+
+
+def _field(encoding: dict, channel: str) -> Optional[str]:
+    value = encoding.get(channel)
+    return value.get("field") if isinstance(value, dict) else None
+
+
+def downsample_chart_spec(spec: dict, max_points: int = DEFAULT_POINT_BUDGET) -> Tuple[dict, int]:
+    """Return ``(spec, original_points)`` with inline ``data.values`` cut to ``max_points``
+
+    Only the top-level inline dataset is reduced; the input spec is not modified.
+    """
+    values = (spec.get("data") or {}).get("values")
+    if not isinstance(values, list) or len(values) <= max_points:
+        return spec, len(values) if isinstance(values, list) else 0
+    encoding = spec.get("encoding") or {}
+    series = _field(encoding, "color") or _field(encoding, "detail")
+    reduced = copy.copy(spec)
+    reduced["data"] = {**spec["data"], "values": downsample_rows(
+        values, max_points, _field(encoding, "x"), _field(encoding, "y"), series
+    )}
+    return reduced, len(values)
+
+
+def parse_chart(chart: dict, max_points: int = DEFAULT_POINT_BUDGET) -> Tuple[dict, int]:
+    """Parse an agent ``chart`` item's ``chart_spec`` JSON and downsample it"""
+    return downsample_chart_spec(json.loads(chart["chart_spec"]), max_points)
+
+
+class RenderCache:
+    """Prepared tables/charts keyed by (message index, content index)
+
+    Messages are append-only, so an entry stays valid until its message is
+    removed; call ``evict_from`` when popping messages.
+    """
+
+    def __init__(self):
+        self._entries: Dict[Hashable, Any] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_or_build(self, key: Tuple[int, int], build: Callable[[], Any]) -> Any:
+        if key in self._entries:
+            self.hits += 1
+            return self._entries[key]
+        self.misses += 1
+        value = self._entries[key] = build()
+        return value
+
+    def evict_from(self, message_index: int):
+        """Drop entries for messages at ``message_index`` and later"""
+        for key in [k for k in self._entries if k[0] >= message_index]:
+            del self._entries[key]
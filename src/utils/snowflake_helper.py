@@ -1,20 +1,43 @@
-from typing import Optional, Dict
+from typing import TYPE_CHECKING, Optional, Dict
 
-import pandas as pd
-from snowflake.snowpark import Session
+from src.utils.admission import BACKGROUND, OUTPUT_TOKEN_ESTIMATE, AdmissionController, Ticket, estimate_tokens
+from src.utils.instrumentation import span
+from src.utils.streaming import CompletionStream, stream_or_fallback
+
+if TYPE_CHECKING:
+    # pandas and Snowpark are imported on first use to keep import time low
+    import pandas as pd
+    from snowflake.snowpark import Session
+
+
+def _frame_bytes(df: "pd.DataFrame") -> int:
+    """Shallow in-memory size of a DataFrame (cheap; ignores string payloads)"""
+    return int(df.memory_usage(index=False).sum())
 
 
 class SnowflakeHelper:
     """Helper class for Snowflake operations"""
 
-    def __init__(self, connection_params: Dict[str, str]):
+    def __init__(self, connection_params: Dict[str, str], admission: Optional[AdmissionController] = None):
         self.connection_params = connection_params
-        self.session: Optional[Session] = None
+        self.session: Optional["Session"] = None
+        # Optional AdmissionController; when set, every warehouse and Cortex call is admitted first
+        self.admission = admission
+
+    def _admit(self, model: Optional[str] = None, tokens: int = 0, level: Optional[int] = None,
+               use_warehouse: bool = True) -> Optional[Ticket]:
+        if self.admission is None:
+            return None
+        warehouse = self.connection_params.get("warehouse") if use_warehouse else None
+        return self.admission.admit(model=model, warehouse=warehouse, tokens=tokens, level=level)
 
-    def connect(self) -> Session:
+    def connect(self) -> "Session":
         """Create and return Snowflake session"""
         if self.session is None:
-            self.session = Session.builder.configs(self.connection_params).create()
+            from snowflake.snowpark import Session
+
+            with span("snowflake.connect", user=self.connection_params.get("user")):
+                self.session = Session.builder.configs(self.connection_params).create()
             print(f"✓ Connected to Snowflake as {self.connection_params['user']}")
             print(f"  Role: {self.session.get_current_role()}")
             print(f"  Warehouse: {self.session.get_current_warehouse()}")
@@ -29,11 +52,24 @@ class SnowflakeHelper:
             self.session = None
             print("✓ Disconnected from Snowflake")
 
-    def execute_query(self, query: str) -> pd.DataFrame:
-        """Execute query and return results as pandas DataFrame"""
+    def execute_query(self, query: str, model: Optional[str] = None, tokens: int = 0) -> "pd.DataFrame":
+        """Execute query and return results as pandas DataFrame
+
+        Queries that run Cortex functions in the warehouse pass ``model`` and
+        their estimated ``tokens`` so admission also charges the model.
+        """
         if not self.session:
             self.connect()
-        return self.session.sql(query).to_pandas()
+        self._admit(model, tokens)
+        with span("snowflake.execute_query") as s:
+            if not s.recording:
+                return self.session.sql(query).to_pandas()
+            # The async job exposes the query ID without an extra round trip
+            job = self.session.sql(query).to_pandas(block=False)
+            s.set(query_id=job.query_id)
+            result = job.result()
+            s.set(rows=len(result), bytes=_frame_bytes(result))
+            return result
 
     def cortex_complete(self, prompt: str, model: str = "mistral-7b") -> str:
         """Use Cortex Complete for text generation"""
@@ -41,10 +77,66 @@ class SnowflakeHelper:
             self.connect()
 
         from snowflake.cortex import complete
-        result = complete(model, prompt, session=self.session)
+        prompt_tokens = estimate_tokens(prompt)
+        ticket = self._admit(model, prompt_tokens + OUTPUT_TOKEN_ESTIMATE)
+        with span("cortex.complete", model=model, prompt_chars=len(prompt)) as s:
+            result = complete(model, prompt, session=self.session)
+            s.set(response_chars=len(result))
+        if ticket:
+            ticket.settle(prompt_tokens + estimate_tokens(result))
+        return result
+
+    def cortex_complete_stream(self, prompt: str, model: str = "mistral-7b") -> CompletionStream:
+        """Stream Cortex Complete tokens as they are generated
+
+        Iterate the returned stream to print tokens as they arrive, or call
+        ``collect()`` for the full text. If streaming cannot start (older
+        ``snowflake-ml-python``, REST endpoint unreachable) the stream falls
+        back to one blocking ``complete`` call yielded as a single chunk.
+        """
+        if not self.session:
+            self.connect()
+
+        from snowflake.cortex import complete
+        prompt_tokens = estimate_tokens(prompt)
+        # Streaming goes through the Cortex REST API, not the warehouse
+        ticket = self._admit(model, prompt_tokens + OUTPUT_TOKEN_ESTIMATE, use_warehouse=False)
+        tokens = stream_or_fallback(
+            lambda: complete(model, prompt, session=self.session, stream=True),
+            lambda: complete(model, prompt, session=self.session),
+            # Counted on the stream's span; tokens are only pulled once the stream exists
+            on_retry=lambda: stream.incr("retries"),
+        )
+        on_finish = (lambda done: ticket.settle(prompt_tokens + estimate_tokens(done.text))) if ticket else None
+        stream = CompletionStream(tokens, "cortex.complete_stream", on_finish=on_finish,
+                                  model=model, prompt_chars=len(prompt))
+        return stream
+
+    def cortex_summarize(self, text: str) -> str:
+        """Use Cortex Summarize for text summarization"""
+        if not self.session:
+            self.connect()
+
+        from snowflake.cortex import summarize
+        self._admit("summarize", estimate_tokens(text))
+        with span("cortex.summarize", text_chars=len(text)) as s:
+            result = summarize(text, session=self.session)
+            s.set(response_chars=len(result))
         return result
 
-    def cortex_search(self, service_name: str, query: str, columns: list, limit: int = 5) -> pd.DataFrame:
+    def cortex_extract_answer(self, text: str, question: str) -> str:
+        """Use Cortex Extract Answer to answer ``question`` from ``text``"""
+        if not self.session:
+            self.connect()
+
+        from snowflake.cortex import extract_answer
+        self._admit("extract_answer", estimate_tokens(text) + estimate_tokens(question))
+        with span("cortex.extract_answer", text_chars=len(text)) as s:
+            result = extract_answer(text, question, session=self.session)
+            s.set(response_chars=len(str(result)))
+        return result
+
+    def cortex_search(self, service_name: str, query: str, columns: list, limit: int = 5) -> "pd.DataFrame":
         """Use Cortex Search for semantic search"""
         if not self.session:
             self.connect()
@@ -60,14 +152,22 @@ class SnowflakeHelper:
             )
         )
         """
-        return self.execute_query(search_query)
+        with span("cortex.search", service=service_name, limit=limit) as s:
+            result = self.execute_query(search_query)
+            s.set(rows=len(result))
+        return result
 
-    def load_data_to_table(self, df: pd.DataFrame, table_name: str, overwrite: bool = False):
+    def load_data_to_table(self, df: "pd.DataFrame", table_name: str, overwrite: bool = False):
         """Load pandas DataFrame to Snowflake table"""
         if not self.session:
             self.connect()
 
         mode = "overwrite" if overwrite else "append"
-        snowpark_df = self.session.create_dataframe(df)
-        snowpark_df.write.mode(mode).save_as_table(table_name)
+        # Bulk loads never queue ahead of interactive questions
+        self._admit(level=BACKGROUND)
+        with span("snowflake.load_data_to_table", table=table_name, mode=mode) as s:
+            if s.recording:
+                s.set(rows=len(df), bytes=_frame_bytes(df))
+            snowpark_df = self.session.create_dataframe(df)
+            snowpark_df.write.mode(mode).save_as_table(table_name)
         print(f"✓ Loaded {len(df)} rows to {table_name}")
@@ -0,0 +1,3 @@
+def sql_literal(value: str) -> str:
+    """Quote ``value`` as a Snowflake single-quoted string literal"""
+    return "'" + value.replace("\\", "\\\\").replace("'", "''") + "'"
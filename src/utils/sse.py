@@ -0,0 +1,54 @@
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+
+def iter_sse(lines: Iterable[Optional[str]]) -> Iterator[Tuple[str, str]]:
+    """Minimal SSE parser over decoded lines (e.g. ``resp.iter_lines(decode_unicode=True)``).
+
+    Yields ``(event, data)`` tuples, one per dispatched event.
+    """
+    event, data_lines = None, []
+    for raw in lines:
+        if raw is None:
+            continue
+        line = raw.rstrip("\n")
+        if line == "":
+            if data_lines:
+                yield (event or "message", "\n".join(data_lines))
+            event, data_lines = None, []
+            continue
+        if line.startswith(":"):
+            continue
+        if line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[5:].lstrip())
+
+    if data_lines:
+        yield (event or "message", "\n".join(data_lines))
+
+
+def collect_agent_message(events: Iterable[Tuple[str, str]]) -> dict:
+    """Assemble the assistant message from Cortex Agent ``(event, data)`` pairs without a UI
+
+    Uses the final ``response`` event when the agent sends one; otherwise
+    joins the text deltas and keeps tables and charts in arrival order.
+    """
+    import json
+
+    buffers: Dict[int, str] = {}
+    content = []
+    for etype, payload in events:
+        if etype == "response.text.delta":
+            d = json.loads(payload)
+            buffers[d["content_index"]] = buffers.get(d["content_index"], "") + d["text"]
+        elif etype == "response.table":
+            content.append({"type": "table", "table": json.loads(payload)})
+        elif etype == "response.chart":
+            content.append({"type": "chart", "chart": json.loads(payload)})
+        elif etype == "error":
+            raise RuntimeError(f"Agent error: {payload}")
+        elif etype == "response":
+            return json.loads(payload)
+    if buffers:
+        content.insert(0, {"type": "text", "text": "".join(buffers[i] for i in sorted(buffers))})
+    return {"role": "assistant", "content": content}
@@ -0,0 +1,139 @@
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from src.utils import instrumentation
+
+_DONE = object()
+
+
+class CompletionStream:
+    """Iterator over completion tokens that records time-to-first-token
+
+    Iterate it (sync or ``async for``) to receive tokens as they arrive, or
+    call ``collect()`` to block until the full text is available. The stream
+    can only be consumed once; ``text`` holds everything received so far.
+    A consumer that stops early should call ``close()`` (or use the stream
+    as a context manager) so the span and done callbacks still run.
+    """
+
+    def __init__(self, tokens: Iterable[str], name: str = "cortex.complete_stream",
+                 on_finish: Optional[Callable[["CompletionStream"], None]] = None, **attributes):
+        self._tokens = iter(tokens)
+        self._name = name
+        self._callbacks: List[Callable[["CompletionStream"], None]] = [on_finish] if on_finish else []
+        self._attributes = attributes
+        self._chunks: List[str] = []
+        self.counters: Dict[str, int] = {}
+        self._start_wall_ns = time.time_ns()
+        self._start = time.perf_counter()
+        self.first_token_s: Optional[float] = None
+        self.total_s: Optional[float] = None
+        self.done = False
+        self.cancelled = False
+        self.error: Optional[BaseException] = None
+
+    @property
+    def text(self) -> str:
+        return "".join(self._chunks)
+
+    def _finish(self, error: Optional[BaseException] = None):
+        self.done = True
+        self.error = error
+        self.total_s = time.perf_counter() - self._start
+        instrumentation.record(
+            self._name, self._start_wall_ns, self._start_wall_ns + int(self.total_s * 1e9),
+            status="error" if error else "cancelled" if self.cancelled else "ok",
+            time_to_first_token_ms=round(self.first_token_s * 1000, 3) if self.first_token_s is not None else None,
+            chunks=len(self._chunks), response_chars=sum(len(c) for c in self._chunks),
+            counters=self.counters, **self._attributes,
+        )
+        for callback in self._callbacks:
+            callback(self)
+
+    def incr(self, counter: str, amount: int = 1):
+        """Increment a counter reported on the stream's span (e.g. ``retries``)"""
+        self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def add_done_callback(self, callback: Callable[["CompletionStream"], None]):
+        """Call ``callback(stream)`` once the stream is exhausted, failed or closed"""
+        self._callbacks.append(callback)
+
+    def close(self):
+        """Stop reading; finishes the stream with what was received (``cancelled`` is set)"""
+        if self.done:
+            return
+        self.cancelled = True
+        close = getattr(self._tokens, "close", None)
+        try:
+            if close is not None:
+                close()
+        finally:
+            self._finish()
+
+    def __enter__(self) -> "CompletionStream":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __iter__(self) -> Iterator[str]:
+        return self
+
+    def __next__(self) -> str:
+        if self.done:
+            raise StopIteration
+        try:
+            token = next(self._tokens)
+        except StopIteration:
+            self._finish()
+            raise
+        except BaseException as e:
+            self._finish(e)
+            raise
+        if self.first_token_s is None:
+            self.first_token_s = time.perf_counter() - self._start
+        self._chunks.append(token)
+        return token
+
+    def __aiter__(self) -> "CompletionStream":
+        return self
+
+    async def __anext__(self) -> str:
+        # Imported here: asyncio pulls in ssl/socket, too heavy for the helper's cold import
+        import asyncio
+
+        # The Cortex client is blocking; pull each token on a worker thread
+        token = await asyncio.to_thread(next, self, _DONE)
+        if token is _DONE:
+            raise StopAsyncIteration
+        return token
+
+    def collect(self) -> str:
+        """Consume the rest of the stream and return the full text"""
+        try:
+            for _ in self:
+                pass
+        finally:
+            self.close()
+        return self.text
+
+
+def stream_or_fallback(open_stream: Callable[[], Iterable[str]], complete: Callable[[], str],
+                       on_retry: Optional[Callable[[], None]] = None) -> Iterator[str]:
+    """Yield from ``open_stream()``; if streaming cannot start, yield ``complete()`` whole
+
+    ``on_retry`` is called when the blocking fallback is attempted. Errors
+    after the first token are re-raised: retrying would duplicate text.
+    """
+    started = False
+    try:
+        for token in open_stream():
+            started = True
+            yield token
+    except Exception as e:
+        if started:
+            raise
+        print(f"Note: streaming unavailable ({e}); falling back to a blocking completion")
+        if on_retry is not None:
+            on_retry()
+        yield complete()